@@ -1,8 +1,20 @@
 from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QPushButton, QStackedWidget, QLabel, QHBoxLayout, QFrame
 from PyQt5.QtGui import QPalette, QColor
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer, QThread, pyqtSignal
+from datetime import datetime
 import sys
 import interface
+import main_program
+import config
+
+class QuickScanThread(QThread):
+    """Runs the ARP sweep off the GUI thread and reports its progress through signals."""
+    progress = pyqtSignal(int, int, int)
+    scan_finished = pyqtSignal(object)
+
+    def run(self):
+        result = main_program.quick_scan(progress=self.progress.emit)
+        self.scan_finished.emit(result)
 
 class HomePage(QWidget):
     def __init__(self):
@@ -22,10 +34,11 @@ class HomePage(QWidget):
         self.status_label.setStyleSheet("font-size: 18px; color: #006400; font-weight: bold;")
         status_section.addWidget(self.status_label)
 
-        scan_button = QPushButton("Run a quick scan")
-        scan_button.setStyleSheet("padding: 10px; font-size: 16px; background-color: #4B0082; color: white; border-radius: 5px;")
-        scan_button.clicked.connect(self.quick_scan)
-        status_section.addWidget(scan_button, alignment=Qt.AlignCenter)
+        self.scan_button = QPushButton("Run a quick scan")
+        self.scan_button.setStyleSheet("padding: 10px; font-size: 16px; background-color: #4B0082; color: white; border-radius: 5px;")
+        self.scan_button.clicked.connect(self.quick_scan)
+        status_section.addWidget(self.scan_button, alignment=Qt.AlignCenter)
+        self.scan_thread = None
         layout.addLayout(status_section)
 
         # Recent Activities
@@ -37,6 +50,12 @@ class HomePage(QWidget):
         self.activities_list.setStyleSheet("font-size: 16px; color: #333;")
         layout.addWidget(self.activities_list)
 
+        # Refresh the recent activities from the device inventory, if one is opened
+        self.activities_timer = QTimer(self)
+        self.activities_timer.timeout.connect(self.update_activities)
+        self.activities_timer.start(5000)
+        self.update_activities()
+
         # Graphs and Visualizations
         visualization_label = QLabel("Safety Visualization")
         visualization_label.setStyleSheet("font-size: 18px; font-weight: bold; color: #4B0082;")
@@ -68,9 +87,43 @@ class HomePage(QWidget):
 
         self.setLayout(layout)
 
+    def update_activities(self):
+        activity = main_program.recent_activity()
+        if activity is None:
+            return
+        if activity["last_seen"]:
+            last_seen = datetime.fromtimestamp(activity["last_seen"]).strftime("%d/%m/%Y at %Hh%M")
+        else:
+            last_seen = "never"
+        self.activities_list.setText(f"- Last activity: {last_seen}.  \n- Devices analyzed: {activity['devices']} "
+                                     f"({activity['active_devices']} in the last 24h). \n- Recent alerts: {activity['recent_alerts']}.")
+
     def quick_scan(self):
+        if self.scan_thread is not None and self.scan_thread.isRunning():
+            return
         self.status_label.setText("🟡 Attention - Une analyse est en cours...")
         self.status_label.setStyleSheet("font-size: 18px; color: #FFA500; font-weight: bold;")
+        self.scan_button.setEnabled(False)
+        self.scan_thread = QuickScanThread(self)
+        self.scan_thread.progress.connect(self.update_scan_progress)
+        self.scan_thread.scan_finished.connect(self.show_scan_result)
+        self.scan_thread.start()
+
+    def update_scan_progress(self, sent, total, found):
+        self.status_label.setText(f"🟡 Attention - Une analyse est en cours... {sent}/{total} hosts, {found} devices found")
+
+    def show_scan_result(self, result):
+        self.scan_button.setEnabled(True)
+        if result is None:
+            self.status_label.setText("🔴 The quick scan failed, see the logs.")
+            self.status_label.setStyleSheet("font-size: 18px; color: #B22222; font-weight: bold;")
+        elif result[1]:
+            self.status_label.setText(f"🟠 {result[1]} unknown devices detected ({result[0]} known).")
+            self.status_label.setStyleSheet("font-size: 18px; color: #FF8C00; font-weight: bold;")
+        else:
+            self.status_label.setText(f"🟢 Everything is fine - {result[0]} known devices, no unknown device.")
+            self.status_label.setStyleSheet("font-size: 18px; color: #006400; font-weight: bold;")
+        self.update_activities()
 
 class AboutPage(QWidget):
     def __init__(self):
@@ -199,6 +252,9 @@ class MainWindow(QWidget):
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
+    main_program.load_config()
+    if config.metrics_port:
+        main_program.start_metrics_server(config.metrics_port)
     window = MainWindow()
     window.show()
     sys.exit(app.exec_())
@@ -0,0 +1,77 @@
+from scapy.all import conf, get_if_addr, get_if_hwaddr
+from scapy.layers.l2 import ARP, Ether
+import ipaddress
+import time
+import capture
+
+def default_network(iface=None):
+    """Return the /24 network of the address of iface."""
+    address = get_if_addr(iface or conf.iface)
+    return ipaddress.ip_network(f"{address}/24", strict=False)
+
+def arp_sweep(network, iface=None, rate=1000, retries=2, timeout=1.0, progress=None, stop_event=None):
+    """
+    Send an ARP request to every host of network and return {ip: mac (int)} of the replies.
+    Only replies from an address that was asked are kept: unsolicited or
+    gratuitous replies and replies from other subnets are ignored.
+    Requests are copies of one prebuilt frame with the target IP patched in, all
+    sent through one L2 socket at about rate frames per second. Hosts that did not
+    answer are asked again up to retries times, each round waiting timeout seconds
+    for late replies. progress(sent, total, found), if given, is called regularly.
+    """
+    iface = iface or conf.iface
+    network = ipaddress.ip_network(network, strict=False)
+    src_mac = get_if_hwaddr(iface)
+    template = bytearray(bytes(Ether(dst="ff:ff:ff:ff:ff:ff", src=src_mac) /
+                               ARP(op=1, hwsrc=src_mac, psrc=get_if_addr(iface), pdst="0.0.0.0")))
+    target_offset = 38  # Ethernet header (14) + offset of the ARP target IP (24)
+
+    total = network.num_addresses - 2 if network.prefixlen < 31 else network.num_addresses
+    found = {}
+    probed = set()  # IPs (str) a request was sent to
+    sent = 0
+    batch_size = max(1, rate // 100)  # Sent every 10 ms
+    sender = conf.L2socket(iface=iface)
+    listener = conf.L2listen(iface=iface, filter="arp and arp[6:2] = 2")  # ARP replies only
+    try:
+        pending = list(network.hosts())
+        for _ in range(retries + 1):
+            start = time.monotonic()
+            for i in range(0, len(pending), batch_size):
+                if stop_event is not None and stop_event.is_set():
+                    return found
+                for ip in pending[i:i + batch_size]:
+                    template[target_offset:target_offset + 4] = ip.packed
+                    sender.send(bytes(template))
+                    probed.add(str(ip))
+                sent += min(batch_size, len(pending) - i)
+                # Pace the sends and read the replies received meanwhile
+                next_batch = start + (i + batch_size) / rate
+                _collect_replies(listener, found, probed, max(0.0, next_batch - time.monotonic()))
+                if progress is not None:
+                    progress(min(sent, total), total, len(found))
+            deadline = time.monotonic() + timeout
+            while time.monotonic() < deadline:
+                _collect_replies(listener, found, probed, deadline - time.monotonic())
+            pending = [ip for ip in pending if str(ip) not in found]
+            if not pending:
+                break
+    finally:
+        sender.close()
+        listener.close()
+    if progress is not None:
+        progress(total, total, len(found))
+    return found
+
+def _collect_replies(listener, found, probed, wait):
+    """Read the replies of the probed IPs available within wait seconds into found."""
+    deadline = time.monotonic() + wait
+    while True:
+        if not listener.select([listener], max(0.0, deadline - time.monotonic())):
+            return
+        _, data, _ = listener.recv_raw()
+        frame = capture.decode_frame(data) if data else None
+        if frame is not None and frame.arp_op == 2 and frame.arp_psrc in probed:
+            found[frame.arp_psrc] = frame.arp_hwsrc
+        if time.monotonic() >= deadline:
+            return
@@ -0,0 +1,93 @@
+from collections import OrderedDict, namedtuple
+import time
+
+# Alert raised by the binding table: kind is "binding_changed" or "mac_claims_many_ips"
+ArpAlert = namedtuple("ArpAlert", "kind ip old_mac new_mac count gratuitous")
+
+class ArpBinding:
+    """MAC address currently bound to an IP, with first/last seen times and a change count."""
+    __slots__ = ("mac", "first_seen", "last_seen", "changes")
+
+    def __init__(self, mac, now):
+        self.mac = mac
+        self.first_seen = now
+        self.last_seen = now
+        self.changes = 0
+
+class ArpBindingTable:
+    """
+    IP -> MAC bindings learnt from ARP traffic.
+    Bindings are kept in least recently seen order, so expired entries (ttl
+    seconds without being seen) and the least recently used ones beyond
+    max_entries are evicted from the front in O(1) per observation.
+    """
+    def __init__(self, max_entries=65536, ttl=4 * 3600.0, max_ips_per_mac=32):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_ips_per_mac = max_ips_per_mac
+        self.bindings = OrderedDict()  # ip -> ArpBinding, least recently seen first
+        self.ips_per_mac = {}  # mac -> number of IPs currently bound to it
+
+    def __len__(self):
+        return len(self.bindings)
+
+    def clear(self):
+        """Forget every binding."""
+        self.bindings.clear()
+        self.ips_per_mac.clear()
+
+    def observe(self, ip, mac, gratuitous=False, now=None):
+        """
+        Record that mac claims ip and return the list of ArpAlert raised.
+        Nothing is raised while a binding stays the same.
+        """
+        if now is None:
+            now = time.monotonic()
+        self._expire(now)
+        alerts = []
+        binding = self.bindings.get(ip)
+
+        if binding is None:
+            self.bindings[ip] = ArpBinding(mac, now)
+            alerts.extend(self._bind(ip, mac, gratuitous))
+            while len(self.bindings) > self.max_entries:
+                self._evict_oldest()
+            return alerts
+
+        self.bindings.move_to_end(ip)
+        binding.last_seen = now
+        if binding.mac != mac:
+            old_mac = binding.mac
+            self._unbind(old_mac)
+            binding.mac = mac
+            binding.changes += 1
+            alerts.append(ArpAlert("binding_changed", ip, old_mac, mac, binding.changes, gratuitous))
+            alerts.extend(self._bind(ip, mac, gratuitous))
+        return alerts
+
+    def _bind(self, ip, mac, gratuitous):
+        count = self.ips_per_mac.get(mac, 0) + 1
+        self.ips_per_mac[mac] = count
+        # Raised once, when the MAC crosses the threshold
+        if count == self.max_ips_per_mac:
+            return [ArpAlert("mac_claims_many_ips", ip, None, mac, count, gratuitous)]
+        return []
+
+    def _unbind(self, mac):
+        count = self.ips_per_mac.get(mac, 0) - 1
+        if count > 0:
+            self.ips_per_mac[mac] = count
+        else:
+            self.ips_per_mac.pop(mac, None)
+
+    def _evict_oldest(self):
+        _, binding = self.bindings.popitem(last=False)
+        self._unbind(binding.mac)
+
+    def _expire(self, now):
+        deadline = now - self.ttl
+        while self.bindings:
+            binding = next(iter(self.bindings.values()))
+            if binding.last_seen >= deadline:
+                return
+            self._evict_oldest()
@@ -0,0 +1,273 @@
+"""
+Benchmarks of the capture and detection pipeline, run offline.
+
+    python benchmark.py generate synthetic.pcap --frames 200000 --macs 2000 --spoof-rate 0.001
+    python benchmark.py run synthetic.pcap --known synthetic.pcap.known.txt --output before.json
+    python benchmark.py compare before.json after.json [--threshold 5]
+    python benchmark.py decoders capture.pcap
+
+generate writes a reproducible synthetic capture (same options and seed, same
+bytes) and the known MAC file of its population. run replays a capture through
+the detector chain and writes the results as JSON: packets per second,
+per-packet latency percentiles, peak RSS and alert counts. compare prints the
+differences between two results and exits with 1 on a regression.
+decoders compares the scapy and raw decoding paths on a capture.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import struct
+import sys
+import tempfile
+import time
+import capture
+import metrics
+from macaddr import format_mac
+
+RESULTS_VERSION = 1
+BROADCAST = b"\xff" * 6
+PCAP_HEADER = struct.pack("<IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, 65535, capture.LINKTYPE_ETHERNET)
+PCAP_RECORD = struct.Struct("<IIII")
+
+# Per-packet latency buckets: 10% steps from 0.1 us to about 1 s
+LATENCY_BUCKETS = tuple(1e-7 * 1.1 ** i for i in range(170))
+LATENCY_PERCENTILES = (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("p99.9", 0.999))
+
+def bench_decoder(name, frames, decode):
+    """Time decode() over every frame and return the packets per second."""
+    start = time.perf_counter()
+    for data in frames:
+        decode(data)
+    elapsed = time.perf_counter() - start
+    pps = len(frames) / elapsed if elapsed else 0.0
+    print(f"[*] {name}: {len(frames)} frames in {elapsed:.3f} s ({pps:,.0f} pps)")
+    return pps
+
+def bench_capture_paths(pcap_path):
+    """Compare the scapy and raw decoding paths on the frames of pcap_path."""
+    from scapy.layers.l2 import Ether
+
+    # Frames are loaded first so that only the decoding cost is measured
+    frames = list(capture.iter_capture_file(pcap_path))
+    if not frames:
+        print(f"[!] No frame found in {pcap_path}")
+        return None
+    scapy_pps = bench_decoder("scapy path", frames, lambda data: capture.frame_from_packet(Ether(data)))
+    raw_pps = bench_decoder("raw path", frames, capture.decode_frame)
+    if scapy_pps:
+        print(f"[*] Raw path speedup: x{raw_pps / scapy_pps:.1f}")
+    return {"frames": len(frames), "scapy_pps": scapy_pps, "raw_pps": raw_pps}
+
+def ipv4_frame(src_mac, src_ip, dst_mac, dst_ip, length):
+    """Build an Ethernet/IPv4/UDP-like frame of length bytes."""
+    header = struct.pack("!BBHHHBBH4s4s", 0x45, 0, length - 14, 0, 0, 64, 17, 0, src_ip, dst_ip)
+    return dst_mac + src_mac + b"\x08\x00" + header + bytes(length - 34)
+
+def arp_frame(op, eth_src, hwsrc, psrc, pdst, hwdst=bytes(6)):
+    """Build an ARP request (op 1) or reply (op 2), padded to the Ethernet minimum."""
+    eth_dst = BROADCAST if op == 1 else hwdst
+    body = struct.pack("!HHBBH6s4s6s4s", 1, 0x0800, 6, 4, op, hwsrc, psrc, hwdst, pdst)
+    return eth_dst + eth_src + b"\x08\x06" + body + bytes(18)
+
+def generate_pcap(path, frames=100000, macs=1000, known_ratio=0.8, arp_ratio=0.1, arp_churn=0.01,
+                  spoof_rate=0.001, rate=10000, seed=0):
+    """
+    Write a synthetic capture of frames frames sent by a population of macs hosts.
+    known_ratio of the hosts are listed in the returned known MAC list, the others
+    are unknown. arp_ratio of the frames are ARP requests; for arp_churn of those two
+    hosts swap their IP addresses first (DHCP reassignment). spoof_rate of the
+    frames come from an attacker, half claiming the IP of a host in an ARP reply,
+    half with an ARP sender MAC that is not its Ethernet MAC. Timestamps advance
+    at rate frames per second. Returns the known MAC addresses (ints).
+    """
+    rng = random.Random(seed)
+    hosts = []  # [mac, ip] as bytes
+    for i in range(macs):
+        mac = bytes([0x02]) + rng.randbytes(5)  # Locally administered unicast addresses
+        hosts.append([mac, struct.pack("!I", 0x0A000001 + i)])  # 10.0.0.1 and up
+    attacker = bytes([0x02, 0xBA, 0xD0]) + rng.randbytes(3)
+    attacker_ip = struct.pack("!I", 0x0AFFFFFE)
+    known = [int.from_bytes(mac, "big") for mac, _ in hosts[:int(macs * known_ratio)]]
+
+    step = 1_000_000 // rate  # Microseconds between two frames
+    timestamp = 1_700_000_000 * 1_000_000
+    with open(path, "wb") as file:
+        file.write(PCAP_HEADER)
+        for _ in range(frames):
+            r = rng.random()
+            if r < spoof_rate:
+                victim = rng.choice(hosts)
+                if rng.random() < 0.5:
+                    data = arp_frame(2, attacker, attacker, victim[1], attacker_ip, victim[0])
+                else:
+                    data = arp_frame(1, attacker, victim[0], attacker_ip, victim[1])
+            elif r < spoof_rate + arp_ratio:
+                host = rng.choice(hosts)
+                if rng.random() < arp_churn:
+                    other = rng.choice(hosts)
+                    host[1], other[1] = other[1], host[1]
+                data = arp_frame(1, host[0], host[0], host[1], rng.choice(hosts)[1])
+            else:
+                host, peer = rng.choice(hosts), rng.choice(hosts)
+                data = ipv4_frame(host[0], host[1], peer[0], peer[1], rng.randrange(60, 1515))
+            file.write(PCAP_RECORD.pack(timestamp // 1_000_000, timestamp % 1_000_000, len(data), len(data)))
+            file.write(data)
+            timestamp += step
+    return known
+
+def peak_rss_kb():
+    """Return the peak resident set size of the process in KB, or None where it is not available."""
+    try:
+        import resource
+    except ImportError:
+        return None  # Windows
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak  # Bytes on macOS, KB elsewhere
+
+def bench_detectors(pcap_path, known_file=None):
+    """
+    Replay pcap_path through the detector chain of main_program and return the results.
+    Every event is counted: deduplication and rate limiting are turned off for the run.
+    """
+    import events
+    import main_program
+    import whriteresults
+
+    alerts = {}
+    def count_event(event):
+        if event.severity >= events.WARNING:
+            kind = event.key[0] if isinstance(event.key, tuple) else event.key or "other"
+            alerts[kind] = alerts.get(kind, 0) + 1
+
+    events.pipeline.handlers = ()  # Nothing printed during the run
+    events.pipeline.dedup_window = 0.0
+    events.pipeline.bucket = events.TokenBucket(float("inf"), float("inf"))
+    events.pipeline.auto_summary = False
+    if known_file:
+        main_program.select_known_mac(known_file)
+    work_dir = tempfile.mkdtemp(prefix="skanowl-bench-")
+    unknown_file = os.path.join(work_dir, "unknown.txt")
+    open(unknown_file, "w").close()
+    main_program.select_unknown_mac(unknown_file)
+    events.pipeline.add_handler(count_event)
+
+    latency = metrics.Histogram(LATENCY_BUCKETS)
+    frames = 0
+    size = 0
+    perf_counter = time.perf_counter
+    start = perf_counter()
+    for data in capture.iter_capture_file(pcap_path):
+        frames += 1
+        size += len(data)
+        frame_start = perf_counter()
+        frame = capture.decode_frame(data)
+        if frame is not None:
+            main_program.dispatch_packet(frame)
+        latency.observe(perf_counter() - frame_start)
+    elapsed = perf_counter() - start
+    whriteresults.mac_writer.flush()
+    events.pipeline.handlers = ()
+    shutil.rmtree(work_dir, ignore_errors=True)
+
+    return {
+        "version": RESULTS_VERSION,
+        "pcap": os.path.basename(pcap_path),
+        "python": platform.python_version(),
+        "frames": frames,
+        "bytes": size,
+        "seconds": elapsed,
+        "pps": frames / elapsed if elapsed else 0.0,
+        "latency_us": {name: (latency.quantile(q) or 0.0) * 1e6 for name, q in LATENCY_PERCENTILES},
+        "peak_rss_kb": peak_rss_kb(),
+        "alerts": dict(sorted(alerts.items())),
+        "detectors": {name: {"frames": count, "us_per_frame": seconds / count * 1e6 if count else 0.0}
+                      for name, (count, seconds) in main_program.detector_stats.items()},
+    }
+
+def compare_results(base, new, threshold=5.0):
+    """Print the differences between two results. Returns the list of regressions above threshold %."""
+    regressions = []
+    rows = [("pps", base.get("pps"), new.get("pps"), True),
+            ("peak_rss_kb", base.get("peak_rss_kb"), new.get("peak_rss_kb"), False)]
+    for name in base.get("latency_us", {}):
+        rows.append((f"latency {name} (us)", base["latency_us"][name], new.get("latency_us", {}).get(name), False))
+    for name, old, value, higher_is_better in rows:
+        if not old or value is None:
+            continue
+        change = (value - old) / old * 100
+        worse = -change if higher_is_better else change
+        flag = ""
+        if worse > threshold:
+            flag = "  <- regression"
+            regressions.append(name)
+        print(f"[*] {name}: {old:,.2f} -> {value:,.2f} ({change:+.1f}%){flag}")
+    if base.get("frames") != new.get("frames"):
+        print(f"[!] The runs did not replay the same number of frames ({base.get('frames')} and {new.get('frames')})")
+    # The same capture must raise the same alerts, whatever the speed
+    for kind in sorted(set(base.get("alerts", {})) | set(new.get("alerts", {}))):
+        old, value = base.get("alerts", {}).get(kind, 0), new.get("alerts", {}).get(kind, 0)
+        if old != value:
+            print(f"[!] Alerts {kind}: {old} -> {value}")
+            regressions.append(f"alerts {kind}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="benchmark", description="Offline benchmarks of the ScanOwl pipeline.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("generate", help="write a synthetic pcap and its known MAC file")
+    command.add_argument("pcap", help="pcap file to write")
+    command.add_argument("--frames", type=int, default=100000)
+    command.add_argument("--macs", type=int, default=1000, help="number of hosts")
+    command.add_argument("--known-ratio", type=float, default=0.8, help="share of the hosts in the known file")
+    command.add_argument("--arp-ratio", type=float, default=0.1, help="share of ARP frames")
+    command.add_argument("--arp-churn", type=float, default=0.01, help="share of ARP frames after an IP reassignment")
+    command.add_argument("--spoof-rate", type=float, default=0.001, help="share of spoofed frames")
+    command.add_argument("--seed", type=int, default=0)
+    command.add_argument("--known-file", help="known MAC file to write (default: PCAP.known.txt)")
+
+    command = commands.add_parser("run", help="replay a capture through the detectors and write JSON results")
+    command.add_argument("pcap", help="pcap or pcapng file to replay")
+    command.add_argument("--known", help="file of known MAC addresses")
+    command.add_argument("--output", help="JSON file to write (default: standard output)")
+
+    command = commands.add_parser("compare", help="compare two JSON results")
+    command.add_argument("base")
+    command.add_argument("new")
+    command.add_argument("--threshold", type=float, default=5.0, help="regression threshold in percent")
+
+    command = commands.add_parser("decoders", help="compare the scapy and raw decoding paths")
+    command.add_argument("pcap")
+
+    args = parser.parse_args(argv)
+    if args.command == "generate":
+        known = generate_pcap(args.pcap, args.frames, args.macs, args.known_ratio, args.arp_ratio, args.arp_churn,
+                              args.spoof_rate, seed=args.seed)
+        known_file = args.known_file or f"{args.pcap}.known.txt"
+        with open(known_file, "w") as file:
+            file.writelines(f"{format_mac(mac)}\n" for mac in known)
+        print(f"[*] Wrote {args.frames:,} frames to {args.pcap} and {len(known):,} known MACs to {known_file}")
+        return 0
+    if args.command == "run":
+        results = bench_detectors(args.pcap, args.known)
+        text = json.dumps(results, indent=2)
+        if args.output:
+            with open(args.output, "w") as file:
+                file.write(text + "\n")
+            print(f"[*] {results['frames']:,} frames at {results['pps']:,.0f} pps, results written to {args.output}")
+        else:
+            print(text)
+        return 0
+    if args.command == "compare":
+        with open(args.base) as file:
+            base = json.load(file)
+        with open(args.new) as file:
+            new = json.load(file)
+        return 1 if compare_results(base, new, args.threshold) else 0
+    return 0 if bench_capture_paths(args.pcap) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
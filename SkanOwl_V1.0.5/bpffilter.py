@@ -0,0 +1,86 @@
+"""
+Kernel-side capture filters that drop the IPv4 traffic of known devices before
+it reaches Python, so the monitoring cost follows the unknown traffic only.
+ARP is always kept: the spoofing detectors must see known devices too.
+
+Only network monitoring uses these filters. The IPv4 frames of the excluded
+devices are never seen by any monitoring detector: they are missing from the
+traffic accounting (top talkers) and from the inventory sightings.
+"""
+import time
+import events
+from macaddr import format_mac
+
+# A BPF program is limited to 4096 instructions and each address or prefix costs about 4 to 6
+MAX_FILTER_CLAUSES = 500
+
+def prefix_clause(prefix, bits):
+    """Return a filter expression matching the source MACs of a prefix."""
+    value = prefix << (48 - bits)
+    high, low = value >> 16, value & 0xFFFF
+    if bits <= 32:
+        mask = (0xFFFFFFFF << (32 - bits)) & 0xFFFFFFFF
+        return f"ether[6:4] & 0x{mask:08x} = 0x{high & mask:08x}"
+    mask = (0xFFFF << (48 - bits)) & 0xFFFF
+    return f"(ether[6:4] = 0x{high:08x} and ether[10:2] & 0x{mask:04x} = 0x{low & mask:04x})"
+
+def build_exclusion_filter(base_filter, macs, prefixes=(), max_clauses=MAX_FILTER_CLAUSES):
+    """
+    Return base_filter without the IPv4 frames sent by macs or by the (prefix, bits) ranges.
+    Returns base_filter unchanged when that takes more than max_clauses addresses and prefixes.
+    """
+    clauses = [f"ether src {format_mac(mac)}" for mac in macs]
+    clauses.extend(prefix_clause(prefix, bits) for prefix, bits in prefixes)
+    if not clauses or len(clauses) > max_clauses:
+        return base_filter
+    return f"({base_filter}) and not (ip and ({' or '.join(clauses)}))"
+
+class ExclusionFilter:
+    """
+    Capture filter excluding the known devices, rebuilt when the known addresses change.
+    Every known prefix is excluded; when the known addresses do not fit in the
+    remaining max_clauses, the busiest ones (from hits) are excluded and the choice
+    is refreshed every refresh_interval seconds. With more prefixes than max_clauses
+    nothing is excluded.
+    """
+    def __init__(self, base_filter, known_macs, known_prefixes, hits, max_clauses=MAX_FILTER_CLAUSES,
+                 min_interval=5.0, refresh_interval=60.0):
+        self.base_filter = base_filter
+        self.known_macs = known_macs
+        self.known_prefixes = known_prefixes
+        self.hits = hits
+        self.max_clauses = max_clauses
+        self.min_interval = min_interval
+        self.refresh_interval = refresh_interval
+        self.version = None
+        self.truncated = False
+        self.last_build = 0.0
+
+    def build(self):
+        """Build the filter for the current known addresses."""
+        self.version = (self.known_macs.version, self.known_prefixes.version)
+        self.last_build = time.monotonic()
+        prefixes = self.known_prefixes.prefixes()
+        if len(prefixes) > self.max_clauses:
+            self.truncated = False
+            events.warning(f"{len(prefixes)} known MAC prefixes do not fit in a capture filter "
+                           f"(at most {self.max_clauses}), known devices are not filtered in the kernel.",
+                           key="bpf_too_many_prefixes")
+            return self.base_filter
+        room = self.max_clauses - len(prefixes)
+        macs = list(self.known_macs)
+        self.truncated = len(macs) > room
+        if self.truncated:
+            macs.sort(key=lambda mac: self.hits.get(mac, 0), reverse=True)
+            macs = macs[:room]
+        return build_exclusion_filter(self.base_filter, macs, prefixes, self.max_clauses)
+
+    def poll(self):
+        """Return a new filter if it must be replaced, otherwise None. Called by the capture loop."""
+        now = time.monotonic()
+        if now - self.last_build < self.min_interval:
+            return None
+        changed = self.version != (self.known_macs.version, self.known_prefixes.version)
+        if changed or (self.truncated and now - self.last_build >= self.refresh_interval):
+            return self.build()
+        return None
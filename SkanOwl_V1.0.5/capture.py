@@ -0,0 +1,324 @@
+from scapy.all import conf
+from scapy.layers.inet import IP, Ether
+from scapy.layers.l2 import ARP
+from collections import namedtuple
+import mmap
+import select
+import socket
+import struct
+import sys
+import time
+import events
+from macaddr import mac_from_bytes, parse_mac
+
+# Linux packet socket option used to read the kernel capture counters (struct tpacket_stats)
+SOL_PACKET = 263
+PACKET_STATISTICS = 6
+
+# Ethernet types decoded by the raw fast path
+ETH_P_ALL = 0x0003
+ETH_P_IP = 0x0800
+ETH_P_ARP = 0x0806
+ETH_P_8021Q = 0x8100
+
+# Capture file formats read by iter_capture_records
+LINKTYPE_ETHERNET = 1
+PCAP_NANOSECOND_MAGICS = (b"\x4d\x3c\xb2\xa1", b"\xa1\xb2\x3c\x4d")
+PCAPNG_SECTION_HEADER = b"\x0a\x0d\x0d\x0a"
+PCAPNG_INTERFACE_DESCRIPTION = 1
+PCAPNG_OPTION_TSRESOL = 9
+PCAPNG_SIMPLE_PACKET = 3
+PCAPNG_ENHANCED_PACKET = 6
+
+# Fixed-offset headers read by the raw fast path
+ETHER_HEADER = struct.Struct("!6s6sH")
+VLAN_HEADER = struct.Struct("!HH")
+ARP_HEADER = struct.Struct("!HHBBH6s4s6s4s")
+IP_SOURCE_OFFSET = 12
+
+# The few fields read by the detectors, decoded once per frame (MAC addresses as 48-bit ints).
+# time is the capture time of a replayed record (epoch seconds), None for live frames.
+Frame = namedtuple("Frame", "src_mac ip_src arp_op arp_psrc arp_hwsrc arp_pdst length time", defaults=(None,))
+
+def new_capture_stats():
+    """Return the counters of one capture run, kept by its session job (see session.CaptureJob)."""
+    return {"frames": 0, "kernel_drops": 0}
+
+def read_kernel_drops(sock):
+    """
+    Return the number of frames dropped by the kernel since the last call,
+    or None when the platform does not expose the counter.
+    """
+    ins = getattr(sock, "ins", sock)
+    if not sys.platform.startswith("linux") or not isinstance(ins, socket.socket):
+        return None
+    try:
+        # The kernel resets tp_packets/tp_drops every time they are read
+        _, drops = struct.unpack("II", ins.getsockopt(SOL_PACKET, PACKET_STATISTICS, 8))
+    except OSError:
+        return None
+    return drops
+
+def update_kernel_drops(sock, stats):
+    """Add the kernel drops seen since the last check to stats."""
+    drops = read_kernel_drops(sock)
+    if drops:
+        stats["kernel_drops"] += drops
+
+def persistent_sniff(filter, prn, stop_event, iface=None, poll_interval=0.5, filter_updates=None, stats=None):
+    """
+    Capture packets on one long-lived socket until stop_event is set.
+    The interface is opened and the BPF filter compiled once for the whole session,
+    so no frame is lost between two sniff() calls. The loop wakes up every
+    poll_interval seconds to check stop_event, even when the link is quiet.
+    filter_updates, if given, is polled at the same rate and returns a new filter
+    to swap in, or None (see bpffilter.ExclusionFilter).
+    Frames and kernel drops are counted in stats (see new_capture_stats).
+    """
+    stats = new_capture_stats() if stats is None else stats
+    sock = conf.L2listen(iface=iface, filter=filter)
+    last_check = time.monotonic()
+    try:
+        while not stop_event.is_set():
+            if sock.select([sock], poll_interval):
+                pkt = sock.recv()
+                if pkt is not None:
+                    stats["frames"] += 1
+                    prn(pkt)
+            now = time.monotonic()
+            if now - last_check >= poll_interval:
+                last_check = now
+                update_kernel_drops(sock, stats)
+                swap_filter(sock, filter_updates, iface)
+    finally:
+        update_kernel_drops(sock, stats)
+        sock.close()
+
+def swap_filter(sock, filter_updates, iface):
+    """Replace the BPF filter of sock if filter_updates returns a new one."""
+    if filter_updates is None:
+        return
+    new_filter = filter_updates()
+    if new_filter is not None:
+        # SO_ATTACH_FILTER replaces the previous program in one step, no frame goes unfiltered
+        _attach_bpf(getattr(sock, "ins", sock), new_filter, iface)
+
+def decode_frame(buf, time=None):
+    """
+    Decode the fields used by the detectors from a raw Ethernet frame
+    (time is the capture time of a replayed record, see Frame).
+    Only fixed offsets are read with struct, no scapy layer is built.
+    Returns None for frames that are neither IPv4 nor ARP.
+    """
+    length = len(buf)
+    if length < 14:
+        return None
+    _, src, ethertype = ETHER_HEADER.unpack_from(buf)
+    offset = 14
+    if ethertype == ETH_P_8021Q and length >= 18:
+        _, ethertype = VLAN_HEADER.unpack_from(buf, offset)
+        offset = 18
+
+    if ethertype == ETH_P_IP and length >= offset + 20:
+        ip_src = socket.inet_ntoa(buf[offset + IP_SOURCE_OFFSET:offset + IP_SOURCE_OFFSET + 4])
+        return Frame(mac_from_bytes(src), ip_src, None, None, None, None, length, time)
+    if ethertype == ETH_P_ARP and length >= offset + ARP_HEADER.size:
+        _, _, _, _, op, hwsrc, psrc, _, pdst = ARP_HEADER.unpack_from(buf, offset)
+        return Frame(mac_from_bytes(src), None, op, socket.inet_ntoa(psrc), mac_from_bytes(hwsrc), socket.inet_ntoa(pdst), length, time)
+    return None
+
+def frame_from_packet(pkt):
+    """Build a Frame from a packet already dissected by scapy."""
+    src_mac = parse_mac(pkt[Ether].src) if pkt.haslayer(Ether) else None
+    original = getattr(pkt, "original", None)
+    length = len(original) if original else 0
+    if pkt.haslayer(IP):
+        return Frame(src_mac, pkt[IP].src, None, None, None, None, length)
+    if pkt.haslayer(ARP):
+        arp = pkt[ARP]
+        return Frame(src_mac, None, arp.op, arp.psrc, parse_mac(arp.hwsrc), arp.pdst, length)
+    return Frame(src_mac, None, None, None, None, None, length)
+
+def as_frame(pkt):
+    """Return pkt as a Frame, converting it if it is a scapy packet."""
+    if type(pkt) is Frame:
+        return pkt
+    return frame_from_packet(pkt)
+
+def raw_sniff(prn, stop_event, iface=None, filter=None, poll_interval=0.5, decode=True, on_poll=None, filter_updates=None,
+              stats=None):
+    """
+    Capture raw frames and call prn with a decoded Frame for each IPv4 or ARP frame
+    (or with the raw bytes of every frame when decode is False).
+    Uses an AF_PACKET socket when available (Linux), otherwise a scapy L2listen
+    socket read with recv_raw(), so no scapy packet is ever dissected.
+    on_poll, if given, is called each time the socket has been drained or the poll timed out.
+    filter_updates and stats work as in persistent_sniff.
+    """
+    stats = new_capture_stats() if stats is None else stats
+    if hasattr(socket, "AF_PACKET"):
+        _raw_sniff_packet_socket(prn, stop_event, iface, filter, poll_interval, decode, on_poll, filter_updates, stats)
+    else:
+        _raw_sniff_l2listen(prn, stop_event, iface, filter, poll_interval, decode, on_poll, filter_updates, stats)
+
+def _attach_bpf(sock, filter, iface):
+    """Attach a BPF filter to a raw packet socket, if scapy can compile it here."""
+    try:
+        from scapy.arch.linux import attach_filter
+    except ImportError:
+        return False
+    try:
+        attach_filter(sock, filter, iface)
+    except Exception as e:
+        events.warning(f"Could not attach capture filter '{filter}': {e}")
+        return False
+    return True
+
+def _raw_sniff_packet_socket(prn, stop_event, iface, filter, poll_interval, decode, on_poll, filter_updates, stats):
+    sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ALL))
+    buf = bytearray(65536)
+    view = memoryview(buf)
+    last_check = time.monotonic()
+    try:
+        if iface:
+            sock.bind((iface, 0))
+        if filter:
+            _attach_bpf(sock, filter, iface)
+        sock.setblocking(False)
+        while not stop_event.is_set():
+            ready, _, _ = select.select([sock], [], [], poll_interval)
+            # Drain everything queued on the socket before going back to select()
+            while ready:
+                try:
+                    n = sock.recv_into(buf)
+                except BlockingIOError:
+                    break
+                stats["frames"] += 1
+                if not decode:
+                    prn(bytes(view[:n]))
+                    continue
+                frame = decode_frame(view[:n])
+                if frame is not None:
+                    prn(frame)
+            if on_poll is not None:
+                on_poll()
+            now = time.monotonic()
+            if now - last_check >= poll_interval:
+                last_check = now
+                update_kernel_drops(sock, stats)
+                swap_filter(sock, filter_updates, iface)
+    finally:
+        update_kernel_drops(sock, stats)
+        sock.close()
+
+def _raw_sniff_l2listen(prn, stop_event, iface, filter, poll_interval, decode, on_poll, filter_updates, stats):
+    sock = conf.L2listen(iface=iface, filter=filter)
+    if filter_updates is not None:
+        events.warning("Updating the capture filter is only supported on Linux, the known-device filter stays fixed.")
+    try:
+        while not stop_event.is_set():
+            if sock.select([sock], poll_interval):
+                _, data, _ = sock.recv_raw()
+                if data:
+                    stats["frames"] += 1
+                    if not decode:
+                        prn(data)
+                    else:
+                        frame = decode_frame(data)
+                        if frame is not None:
+                            prn(frame)
+            if on_poll is not None:
+                on_poll()
+    finally:
+        sock.close()
+
+def iter_capture_file(path):
+    """Yield the raw Ethernet frames of a pcap or pcapng file (see iter_capture_records)."""
+    for _, data in iter_capture_records(path):
+        yield data
+
+def iter_capture_records(path):
+    """
+    Yield (timestamp, frame) for the Ethernet records of a pcap or pcapng file,
+    timestamp being the capture time of the record in epoch seconds.
+    The file is mapped in memory and read record by record, so it is never
+    loaded as a whole. Records of non-Ethernet interfaces are skipped.
+    """
+    with open(path, "rb") as file:
+        try:
+            data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            return  # Empty file
+        try:
+            if data[:4] == PCAPNG_SECTION_HEADER:
+                yield from _iter_pcapng(data)
+            else:
+                yield from _iter_pcap(data, path)
+        finally:
+            data.close()
+
+def _iter_pcap(data, path):
+    magic = data[:4]
+    if magic in (b"\xd4\xc3\xb2\xa1", b"\x4d\x3c\xb2\xa1"):
+        order = "<"
+    elif magic in (b"\xa1\xb2\xc3\xd4", b"\xa1\xb2\x3c\x4d"):
+        order = ">"
+    else:
+        raise ValueError(f"{path} is not a pcap or pcapng file")
+    if len(data) < 24 or struct.unpack_from(order + "I", data, 20)[0] != LINKTYPE_ETHERNET:
+        return
+    fraction = 1e9 if magic in PCAP_NANOSECOND_MAGICS else 1e6
+    record = struct.Struct(order + "IIII")
+    offset = 24
+    end = len(data)
+    while offset + record.size <= end:
+        seconds, subseconds, captured, _ = record.unpack_from(data, offset)
+        offset += record.size
+        if offset + captured > end:
+            return  # Truncated capture
+        yield seconds + subseconds / fraction, data[offset:offset + captured]
+        offset += captured
+
+def _pcapng_resolution(data, order, offset, length):
+    """Return the timestamp unit (seconds) of an interface description block."""
+    option = offset + 16
+    end = offset + length - 4
+    while option + 4 <= end:
+        code, size = struct.unpack_from(order + "HH", data, option)
+        if code == 0:
+            break
+        if code == PCAPNG_OPTION_TSRESOL and size >= 1:
+            value = data[option + 4]
+            # The high bit selects a power of 2 instead of a power of 10
+            return 2.0 ** -(value & 0x7f) if value & 0x80 else 10.0 ** -value
+        option += 4 + (size + 3) // 4 * 4
+    return 1e-6
+
+def _iter_pcapng(data):
+    order = "<"
+    interfaces = []  # (link type, timestamp unit) of each interface of the current section
+    timestamp = None  # Simple packet blocks carry no time, they reuse the previous one
+    offset = 0
+    end = len(data)
+    while offset + 12 <= end:
+        block_type = data[offset:offset + 4]
+        if block_type == PCAPNG_SECTION_HEADER:
+            # The byte-order magic tells the endianness of the whole section
+            order = "<" if data[offset + 8:offset + 12] == b"\x4d\x3c\x2b\x1a" else ">"
+            interfaces = []
+        block_type, length = struct.unpack_from(order + "II", data, offset)
+        if length < 12 or offset + length > end:
+            return  # Truncated or corrupted capture
+        if block_type == PCAPNG_INTERFACE_DESCRIPTION:
+            linktype = struct.unpack_from(order + "H", data, offset + 8)[0]
+            interfaces.append((linktype, _pcapng_resolution(data, order, offset, length)))
+        elif block_type == PCAPNG_ENHANCED_PACKET:
+            interface, high, low, captured, _ = struct.unpack_from(order + "IIIII", data, offset + 8)
+            if interface < len(interfaces) and interfaces[interface][0] == LINKTYPE_ETHERNET:
+                timestamp = ((high << 32) | low) * interfaces[interface][1]
+                yield timestamp, data[offset + 28:offset + 28 + captured]
+        elif block_type == PCAPNG_SIMPLE_PACKET:
+            original = struct.unpack_from(order + "I", data, offset + 8)[0]
+            if interfaces and interfaces[0][0] == LINKTYPE_ETHERNET:
+                yield timestamp, data[offset + 12:offset + 12 + min(original, length - 16)]
+        offset += length
@@ -1,2 +1,44 @@
-known_mac_file = ""
-unknown_mac_file = ""
\ No newline at end of file
+known_mac_file = ""  # Known MAC file loaded at startup
+unknown_mac_file = ""  # Unknown MAC file used at startup, its addresses are not logged again
+watch_mac_files = True  # Re-read the known MAC file when it changes on disk
+watch_interval = 2.0  # Seconds between two checks of the file
+
+# IEEE registry CSV (oui.csv, mam.csv or oui36.csv) used to name the vendor of unknown devices
+oui_csv_file = ""
+
+# ARP binding table used by the ARP spoofing detection
+arp_table_size = 65536  # Maximum number of IP -> MAC bindings kept in memory
+arp_binding_ttl = 4 * 3600  # Seconds after which a binding that was not seen again is forgotten
+arp_max_ips_per_mac = 32  # Alert when one MAC address claims this many IP addresses
+
+# SQLite device inventory (devices, IP bindings, alerts). Empty to keep only the text files
+inventory_db_file = ""
+
+# Quick scan (active ARP sweep)
+quick_scan_network = ""  # Subnet to sweep, e.g. 192.168.0.0/22. Empty: the /24 of the capture interface
+quick_scan_rate = 1000  # ARP requests sent per second
+
+# Traffic accounting per device (constant memory, see traffic.py)
+traffic_windows = (60, 300, 3600)  # Window lengths in seconds, the first one is rolled up into the others
+traffic_sketch_width = 2048  # Counters per sketch row (power of two); error about 2.7 / width of the traffic
+traffic_sketch_depth = 4  # Sketch rows; the error bound holds with probability 1 - e^-depth
+traffic_top_candidates = 64  # Top talkers tracked per window
+
+# Seconds a capture job gets to stop before a warning is reported
+stop_timeout = 5.0
+
+# Alert emails (see notifsmails.py). Empty smtp_host or mail_recipients: no mail
+smtp_host = ""
+smtp_port = 587
+smtp_starttls = True
+smtp_username = ""
+smtp_password = ""
+mail_sender = "scanowl@localhost"
+mail_recipients = ()  # e.g. ("admin@example.com",)
+mail_digest_size = 20  # Alerts per mail at most
+mail_digest_interval = 60.0  # Seconds an alert may wait for others before the mail is sent
+mail_queue_size = 1000  # Alerts waiting to be sent, newer ones are dropped beyond it
+
+# Metrics endpoint (Prometheus text format), served on 127.0.0.1 only. 0 to disable
+# Used by the GUI and as the default of skanowl --metrics-port
+metrics_port = 0
\ No newline at end of file
@@ -0,0 +1,210 @@
+from collections import deque, namedtuple
+import threading
+import time
+
+# Severity levels
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ALERT = 40
+
+SEVERITY_PREFIXES = {DEBUG: "[.]", INFO: "[*]", WARNING: "[!]", ALERT: "[!!]"}
+
+# suppressed is the number of events with the same key dropped since the last one emitted
+Event = namedtuple("Event", "time severity key message suppressed")
+
+class TokenBucket:
+    """Allow rate events per second on average, with bursts of up to burst events."""
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.last = time.monotonic()
+
+    def take(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+class EventPipeline:
+    """
+    Structured replacement for the print() calls of the detectors.
+    Events with the same key are emitted at most once per dedup_window seconds,
+    events below ALERT go through a token bucket, and per-frame observations are
+    only counted with tally() and reported as one summary every summary_interval
+    seconds. Log volume follows the number of distinct events, not the packet rate.
+    Events dropped by the rate limit are counted and reported in the summary, so
+    an event that never comes back (a new device, say) is not lost silently.
+    """
+    def __init__(self, dedup_window=30.0, rate=20.0, burst=50, summary_interval=10.0):
+        self.dedup_window = dedup_window
+        self.auto_summary = True  # Emit the summaries from a background thread
+        self.bucket = TokenBucket(rate, burst)
+        self.summary_interval = summary_interval
+        self.handlers = ()
+        self.last_emitted = {}  # key -> time of the last event emitted with it
+        self.suppressed = {}  # key -> events dropped since then
+        self.tallies = {}  # category -> {subject: frames}
+        self.rate_limited = 0  # Events dropped by the token bucket since the last summary
+        self.lock = threading.Lock()
+        self.summary_thread = None
+
+    def add_handler(self, handler):
+        """Call handler(event) for every event emitted."""
+        with self.lock:
+            self.handlers = self.handlers + (handler,)
+
+    def remove_handler(self, handler):
+        with self.lock:
+            self.handlers = tuple(h for h in self.handlers if h != handler)  # Bound methods are equal, not identical
+
+    def emit(self, severity, message, key=None):
+        """Emit an event unless its key was seen in the dedup window or the rate limit is reached."""
+        now = time.monotonic()
+        with self.lock:
+            if key is not None:
+                last = self.last_emitted.get(key)
+                if last is not None and now - last < self.dedup_window:
+                    self.suppressed[key] = self.suppressed.get(key, 0) + 1
+                    return False
+            limited = severity < ALERT and not self.bucket.take(now)
+            if limited:
+                self.rate_limited += 1
+                if key is not None:
+                    self.suppressed[key] = self.suppressed.get(key, 0) + 1
+            else:
+                suppressed = 0
+                if key is not None:
+                    self.last_emitted[key] = now
+                    suppressed = self.suppressed.pop(key, 0)
+        if limited:
+            if self.summary_thread is None and self.auto_summary:
+                self._start_summary_thread()  # Reports the count in the next summary
+            return False
+        self._publish(Event(time.time(), severity, key, message, suppressed))
+        return True
+
+    def tally(self, category, subject):
+        """Count one frame for subject; reported in the next summary of category."""
+        with self.lock:
+            subjects = self.tallies.get(category)
+            if subjects is None:
+                subjects = self.tallies[category] = {}
+            subjects[subject] = subjects.get(subject, 0) + 1
+        if self.summary_thread is None and self.auto_summary:
+            self._start_summary_thread()
+
+    def take_tallies(self):
+        """Return the counts accumulated since the last summary and reset them."""
+        with self.lock:
+            tallies, self.tallies = self.tallies, {}
+        return tallies
+
+    def merge_tallies(self, tallies):
+        """Add counts taken from another pipeline (e.g. a worker process) to the next summary."""
+        with self.lock:
+            for category, counts in tallies.items():
+                subjects = self.tallies.setdefault(category, {})
+                for subject, frames in counts.items():
+                    subjects[subject] = subjects.get(subject, 0) + frames
+        if self.summary_thread is None and self.auto_summary:
+            self._start_summary_thread()
+
+    def flush(self):
+        """Emit the pending summaries now."""
+        with self.lock:
+            tallies, self.tallies = self.tallies, {}
+            rate_limited, self.rate_limited = self.rate_limited, 0
+            # Forget the keys whose dedup window is over, so memory stays bounded
+            deadline = time.monotonic() - self.dedup_window
+            self.last_emitted = {k: t for k, t in self.last_emitted.items() if t >= deadline}
+            self.suppressed = {k: n for k, n in self.suppressed.items() if k in self.last_emitted}
+        for category, subjects in tallies.items():
+            frames = sum(subjects.values())
+            message = f"{frames:,} frames from {len(subjects):,} {category} in last {self.summary_interval:.0f}s"
+            self._publish(Event(time.time(), INFO, ("summary", category), message, 0))
+        if rate_limited:
+            message = f"{rate_limited:,} events rate-limited in last {self.summary_interval:.0f}s"
+            self._publish(Event(time.time(), WARNING, "rate_limited", message, 0))
+
+    def _publish(self, event):
+        for handler in self.handlers:
+            try:
+                handler(event)
+            except Exception:
+                pass  # A failing handler must never stop the capture thread
+
+    def _start_summary_thread(self):
+        with self.lock:
+            if self.summary_thread is not None:
+                return
+            self.summary_thread = threading.Thread(target=self._summary_loop, daemon=True)
+        self.summary_thread.start()
+
+    def _summary_loop(self):
+        while True:
+            time.sleep(self.summary_interval)
+            self.flush()
+
+class EventQueue:
+    """
+    Bounded queue of events for a consumer running at its own pace (the GUI).
+    put() is a pipeline handler that never blocks: when the consumer falls
+    behind, the oldest events are dropped and counted in dropped.
+    """
+    def __init__(self, maxlen=5000):
+        self.items = deque(maxlen=maxlen)  # deque.append and popleft are thread-safe
+        self.dropped = 0
+
+    def put(self, event):
+        if len(self.items) == self.items.maxlen:
+            self.dropped += 1  # Approximate under contention, only used for display
+        self.items.append(event)
+
+    def drain(self, limit=None):
+        """Return the queued events, oldest first (at most limit of them)."""
+        events = []
+        while self.items and (limit is None or len(events) < limit):
+            try:
+                events.append(self.items.popleft())
+            except IndexError:
+                break
+        return events
+
+    def take_dropped(self):
+        dropped, self.dropped = self.dropped, 0
+        return dropped
+
+def format_event(event):
+    """Return the event as one log line."""
+    suffix = f" ({event.suppressed} similar suppressed)" if event.suppressed else ""
+    return f"{SEVERITY_PREFIXES.get(event.severity, '[*]')} {event.message}{suffix}"
+
+def print_handler(event):
+    """Default handler: print the event like the rest of the program."""
+    print(f"{format_event(event)}\n")
+
+# Pipeline shared by the whole program
+pipeline = EventPipeline()
+pipeline.add_handler(print_handler)
+
+def emit(severity, message, key=None):
+    return pipeline.emit(severity, message, key)
+
+def info(message, key=None):
+    return pipeline.emit(INFO, message, key)
+
+def warning(message, key=None):
+    return pipeline.emit(WARNING, message, key)
+
+def alert(message, key=None):
+    return pipeline.emit(ALERT, message, key)
+
+def tally(category, subject):
+    pipeline.tally(category, subject)
+
+def flush():
+    pipeline.flush()
@@ -0,0 +1,50 @@
+"""
+Polling file watcher, portable and cheap: one os.stat() per file and interval.
+"""
+import os
+import threading
+import events
+
+class FileWatcher:
+    """
+    Call on_change(path) from a background thread when the file at path is
+    modified, replaced (new inode, as editors save) or created again.
+    A change is only reported once the file has not moved for one interval,
+    so a file being written is not read half-way.
+    """
+    def __init__(self, path, on_change, interval=2.0):
+        self.path = path
+        self.on_change = on_change
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.signature = self._signature()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _signature(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _run(self):
+        pending = None  # Signature seen changed at the previous poll
+        while not self.stop_event.wait(self.interval):
+            signature = self._signature()
+            if signature == self.signature or signature is None:
+                pending = None
+                continue
+            if signature != pending:
+                pending = signature  # Still changing, look again at the next poll
+                continue
+            self.signature = signature
+            pending = None
+            try:
+                self.on_change(self.path)
+            except Exception as e:
+                # The watcher keeps going, the next change is read again
+                events.warning(f"Error reloading {self.path}: {e}", key=("file_watch_error", self.path))
+
+    def stop(self):
+        self.stop_event.set()
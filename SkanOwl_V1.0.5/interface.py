@@ -1,37 +1,34 @@
-from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QPushButton, QLineEdit, QFileDialog, QLabel, QHBoxLayout, QFrame, QTextEdit
+from PyQt5.QtWidgets import QApplication, QWidget, QVBoxLayout, QPushButton, QLineEdit, QFileDialog, QLabel, QHBoxLayout, QFrame, QPlainTextEdit
 import sys
 from PyQt5.QtGui import QPalette, QColor
-from PyQt5.QtCore import Qt, pyqtSignal, QObject
+from PyQt5.QtCore import Qt, QTimer
 import main_program
-import io
+import config
+import events
+import time
 
-class TerminalOutput(io.StringIO):
-    """
-    This class captures the output of print() and directs it to QTextEdit in the GUI.
-    """
-    def __init__(self, text_edit_widget, update_signal, previous_output):
-        super().__init__()
-        self.text_edit = text_edit_widget
-        self.update_signal = update_signal
-        self.previous_output = previous_output
-
-    def write(self, text):
-        if text != '\n':  # Avoid emitting empty lines
-            if text != self.previous_output:
-                self.previous_output = text
-                self.update_signal.emit(f"\t{text}")
+# GUI log: lines kept in the view, and refresh period of the view
+LOG_MAX_LINES = 5000
+LOG_REFRESH_MS = 100
+STATS_REFRESH_MS = 1000
+TOP_TALKERS = 5  # Devices listed under the statistics line
 
 class Interface(QWidget):
-    update_output_signal = pyqtSignal(str)
-
     def __init__(self):
         super().__init__()
+        # Events waiting to be shown, the oldest are dropped if the GUI falls behind.
+        # The engine threads only append to it, they never wait for the GUI.
+        self.event_queue = events.EventQueue(LOG_MAX_LINES)
+        self.event_handler = self.event_queue.put  # Kept to remove the same bound method later
         self.init_ui()
-        self.last_output = ""
-        self.redirect_print()
-        self.update_output_signal.connect(self.update_output)
-        self.monitoring_running = False
-        self.acquisition_running = False
+        events.pipeline.add_handler(self.event_handler)
+        self.output_timer = QTimer(self)
+        self.output_timer.timeout.connect(self.update_output)
+        self.output_timer.start(LOG_REFRESH_MS)
+        self.last_stats = (time.monotonic(), 0)  # (time, frames) of the previous stats refresh
+        self.stats_timer = QTimer(self)
+        self.stats_timer.timeout.connect(self.update_stats)
+        self.stats_timer.start(STATS_REFRESH_MS)
 
     def init_ui(self):
         self.setWindowTitle("ScanOwl")
@@ -92,40 +89,67 @@ class Interface(QWidget):
         self.btn_network_monitoring.clicked.connect(self.toggle_network_monitoring)
         control_section.addWidget(self.btn_network_monitoring)
 
+        self.btn_restart_monitoring = QPushButton("Restart Monitoring", self)
+        self.btn_restart_monitoring.setStyleSheet("background-color: #87CEFA; padding: 10px; border-radius: 5px;")
+        self.btn_restart_monitoring.clicked.connect(self.restart_network_monitoring)
+        self.btn_restart_monitoring.setEnabled(False)  # Only while monitoring runs, see update_buttons
+        control_section.addWidget(self.btn_restart_monitoring)
+
         self.btn_stop_program = QPushButton("Stop the program", self)
         self.btn_stop_program.setStyleSheet("background-color: #FF6347; padding: 10px; border-radius: 5px; color: white;")
-        self.btn_stop_program.clicked.connect(main_program.stop_all_threads)
+        self.btn_stop_program.clicked.connect(self.stop_program)
         control_section.addWidget(self.btn_stop_program)
 
         layout.addLayout(control_section)
 
+        # Live statistics of the capture and detectors
+        self.stats_label = QLabel(self)
+        self.stats_label.setStyleSheet("font-size: 12px; color: #4B0082;")
+        layout.addWidget(self.stats_label)
+        self.talkers_label = QLabel(self)
+        self.talkers_label.setStyleSheet("font-size: 12px; color: #4B0082;")
+        layout.addWidget(self.talkers_label)
+
         # Text display
-        self.text_display = QTextEdit(self)
+        self.text_display = QPlainTextEdit(self)
         self.text_display.setReadOnly(True)
+        self.text_display.setMaximumBlockCount(LOG_MAX_LINES)  # Oldest lines are trimmed
         self.text_display.setPlaceholderText("The file content will appear here...")
         layout.addWidget(self.text_display)
 
         self.setLayout(layout)
 
     def toggle_mac_acquisition(self):
-        if self.acquisition_running:
-            main_program.stop_all_threads()
-            self.acquisition_running = False
-            self.btn_mac_acquisition.setText("Acquisition of MAC addresses")
+        # Start and stop return at once, the capture jobs finish in their own threads
+        if main_program.session.is_active(main_program.ACQUISITION):
+            main_program.stop_mac_acquisition()
         else:
             main_program.start_mac_acquisition_thread()
-            self.acquisition_running = True
-            self.btn_mac_acquisition.setText("Stop MAC Acquisition")
+        self.update_buttons()
 
     def toggle_network_monitoring(self):
-        if self.monitoring_running:
+        if main_program.session.is_active(main_program.MONITORING):
             main_program.stop_network_monitoring()
-            self.monitoring_running = False
-            self.btn_network_monitoring.setText("Network Monitoring")
         else:
             main_program.start_network_monitoring_threads()
-            self.monitoring_running = True
-            self.btn_network_monitoring.setText("Stop Monitoring")
+        self.update_buttons()
+
+    def restart_network_monitoring(self):
+        # A new capture starts at once, the previous one closes its socket in its own thread
+        main_program.restart_network_monitoring()
+        self.update_buttons()
+
+    def stop_program(self):
+        main_program.stop_all_threads()
+        self.update_buttons()
+
+    def update_buttons(self):
+        """Show the state of the capture jobs on their buttons."""
+        acquiring = main_program.session.is_active(main_program.ACQUISITION)
+        self.btn_mac_acquisition.setText("Stop MAC Acquisition" if acquiring else "Acquisition of MAC addresses")
+        monitoring = main_program.session.is_active(main_program.MONITORING)
+        self.btn_network_monitoring.setText("Stop Monitoring" if monitoring else "Network Monitoring")
+        self.btn_restart_monitoring.setEnabled(monitoring)
 
     def select_known_mac(self):
         file_path, _ = QFileDialog.getOpenFileName(self, "Select the file of known MAC addresses", "", "Text Files (*.txt);;All Files (*)")
@@ -145,23 +169,51 @@ class Interface(QWidget):
         try:
             with open(file_path, 'r') as file:
                 content = file.read()
-                self.text_display.setText(content)
+                self.text_display.setPlainText(content)
         except Exception as e:
-            self.text_display.setText(f"Error while opening the file: {e}")
-
-    def update_output(self, text):
-        cursor = self.text_display.textCursor()
-        cursor.movePosition(cursor.End)
-        cursor.insertText(text)
-        self.text_display.setTextCursor(cursor)
-        self.text_display.ensureCursorVisible()
-
-    def redirect_print(self):
-        sys.stdout = TerminalOutput(self.text_display, self.update_output_signal, self.last_output)
-        sys.stderr = TerminalOutput(self.text_display, self.update_output_signal, self.last_output)
+            self.text_display.setPlainText(f"Error while opening the file: {e}")
+
+    def update_output(self):
+        """Append every pending event to the log view in one batch."""
+        pending = self.event_queue.drain()
+        if not pending:
+            return
+        lines = [f"\t{events.format_event(event)}" for event in pending]
+        dropped = self.event_queue.take_dropped()
+        if dropped:
+            lines.insert(0, f"\t[!] {dropped:,} messages dropped, the display could not keep up")
+        self.text_display.appendPlainText("\n".join(lines))
+
+    def update_stats(self):
+        """Refresh the statistics line: frame rate, drops, writer queue and detector latencies."""
+        self.update_buttons()  # A job may also end by itself (capture error)
+        stats = main_program.monitoring_stats()
+        now = time.monotonic()
+        last_time, last_frames = self.last_stats
+        frames = stats["frames"]
+        rate = max(0, frames - last_frames) / (now - last_time) if now > last_time else 0.0
+        self.last_stats = (now, frames)
+        parts = [f"{rate:,.0f} frames/s", f"{frames:,} frames", f"{stats['kernel_drops']:,} dropped",
+                 f"writer queue {stats['writer_queue']}"]
+        for name, (count, p50, p99) in stats["detectors"].items():
+            if p50 is not None:
+                parts.append(f"{name}: p50 {p50 * 1e6:.0f} us, p99 {p99 * 1e6:.0f} us")
+        self.stats_label.setText("  |  ".join(parts))
+
+        talkers = main_program.top_talkers(TOP_TALKERS)
+        if talkers:
+            self.talkers_label.setText("Top talkers (last minute): " + "  |  ".join(
+                f"{mac} ({vendor}) {sent / 1e6:.1f} MB" for mac, vendor, sent, _ in talkers))
+
+    def closeEvent(self, event):
+        events.pipeline.remove_handler(self.event_handler)
+        super().closeEvent(event)
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)
+    main_program.load_config()
+    if config.metrics_port:
+        main_program.start_metrics_server(config.metrics_port)
     window = Interface()
     window.show()
     sys.exit(app.exec_())
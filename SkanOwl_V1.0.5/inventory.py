@@ -0,0 +1,244 @@
+import queue
+import sqlite3
+import threading
+import time
+import events
+from macaddr import format_mac, read_mac_file
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS devices (
+    mac INTEGER PRIMARY KEY,
+    known INTEGER NOT NULL DEFAULT 0,
+    logged INTEGER NOT NULL DEFAULT 0,
+    vendor TEXT,
+    first_seen REAL,
+    last_seen REAL,
+    frames INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS devices_last_seen ON devices (last_seen);
+CREATE TABLE IF NOT EXISTS ip_bindings (
+    mac INTEGER NOT NULL,
+    ip TEXT NOT NULL,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL,
+    PRIMARY KEY (mac, ip)
+);
+CREATE INDEX IF NOT EXISTS ip_bindings_ip ON ip_bindings (ip);
+CREATE TABLE IF NOT EXISTS alerts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    time REAL NOT NULL,
+    severity INTEGER NOT NULL,
+    message TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS alerts_time ON alerts (time);
+"""
+
+# Warnings stored as alerts by record_event (first item of the event key)
+ALERT_EVENT_KEYS = frozenset({"unknown_mac"})
+
+UPSERT_DEVICE_SEEN = """
+INSERT INTO devices (mac, first_seen, last_seen, frames) VALUES (?, ?, ?, ?)
+ON CONFLICT (mac) DO UPDATE SET
+    first_seen = coalesce(min(first_seen, excluded.first_seen), excluded.first_seen),
+    last_seen = coalesce(max(last_seen, excluded.last_seen), excluded.last_seen),
+    frames = frames + excluded.frames
+"""
+
+UPSERT_IP_BINDING = """
+INSERT INTO ip_bindings (mac, ip, first_seen, last_seen) VALUES (?, ?, ?, ?)
+ON CONFLICT (mac, ip) DO UPDATE SET last_seen = max(last_seen, excluded.last_seen)
+"""
+
+# logged: the device was reported in the unknown MAC file. It is cleared when
+# the device becomes known, so a device removed from the known list later is
+# not taken for one already reported.
+UPSERT_DEVICE_STATUS = """
+INSERT INTO devices (mac, known, logged, vendor) VALUES (?, ?, ?, ?)
+ON CONFLICT (mac) DO UPDATE SET
+    known = excluded.known,
+    logged = CASE WHEN excluded.known THEN 0 ELSE max(logged, excluded.logged) END,
+    vendor = coalesce(excluded.vendor, vendor)
+"""
+
+class Inventory:
+    """
+    Device inventory stored in SQLite: devices, IP bindings and alerts.
+    All writes go through one writer thread that commits them in batches, one
+    transaction every flush_interval seconds. Sightings reported for every frame
+    are first merged in memory, so the database sees one row per device and IP.
+    """
+    def __init__(self, path, flush_interval=2.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.sightings = {}  # (mac, ip) -> [first seen, last seen, frames] waiting to be written
+        self.sightings_lock = threading.Lock()
+        self.queue = queue.SimpleQueue()  # Other writes: ("status", ...), ("alert", ...), flush events
+        connection = self._connect()
+        connection.executescript(SCHEMA)
+        columns = [row[1] for row in connection.execute("PRAGMA table_info(devices)")]
+        if "logged" not in columns:  # Inventory created by an older version
+            connection.execute("ALTER TABLE devices ADD COLUMN logged INTEGER NOT NULL DEFAULT 0")
+        connection.close()
+        self.stopping = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=10.0)
+        connection.execute("PRAGMA journal_mode=WAL")  # Readers do not wait for the writer
+        return connection
+
+    def load_index(self):
+        """
+        Return (known MACs, unknown MACs already logged) as sets of ints, without
+        loading any history. Devices only seen, or no longer known, are in neither set.
+        """
+        known, unknown = set(), set()
+        connection = self._connect()
+        try:
+            for mac, is_known, logged in connection.execute("SELECT mac, known, logged FROM devices"):
+                if is_known:
+                    known.add(mac)
+                elif logged:
+                    unknown.add(mac)
+        finally:
+            connection.close()
+        return known, unknown
+
+    def record_sighting(self, mac, ip=None):
+        """Record that mac was seen (with ip). Cheap enough to be called for every frame."""
+        now = time.time()
+        key = (mac, ip)
+        with self.sightings_lock:
+            entry = self.sightings.get(key)
+            if entry is None:
+                self.sightings[key] = [now, now, 1]
+            else:
+                entry[1] = now
+                entry[2] += 1
+
+    def record_sightings(self, sightings):
+        """Record sightings summed elsewhere, {(mac, ip): (first seen, last seen, frames)}."""
+        with self.sightings_lock:
+            for key, (first, last, frames) in sightings.items():
+                entry = self.sightings.get(key)
+                if entry is None:
+                    self.sightings[key] = [first, last, frames]
+                else:
+                    entry[0] = min(entry[0], first)
+                    entry[1] = max(entry[1], last)
+                    entry[2] += frames
+
+    def set_status(self, mac, known, vendor=None, logged=False):
+        """Mark a device as known or unknown; logged: an unknown device reported in the unknown MAC file."""
+        self.queue.put(("status", (mac, 1 if known else 0, 1 if logged and not known else 0, vendor)))
+
+    def record_alert(self, severity, message):
+        self.queue.put(("alert", (time.time(), severity, message)))
+
+    def record_event(self, event):
+        """
+        Event pipeline handler keeping the security alerts in the alerts table:
+        every ALERT, and the warnings whose key is in ALERT_EVENT_KEYS. Operational
+        warnings (files, capture, rate limits) are not alerts.
+        """
+        kind = event.key[0] if isinstance(event.key, tuple) else event.key
+        if event.severity >= events.ALERT or (event.severity >= events.WARNING and kind in ALERT_EVENT_KEYS):
+            self.record_alert(event.severity, event.message)
+
+    def import_text(self, file_path, known):
+        """Import a known/unknown MAC text file. Returns the number of addresses."""
+        macs = read_mac_file(file_path)
+        for mac in macs:
+            self.set_status(mac, known, logged=not known)
+        return len(macs)
+
+    def export_text(self, file_path, known):
+        """Write the known (or the logged unknown) MAC addresses to a text file, one per line."""
+        self.flush()
+        connection = self._connect()
+        try:
+            if known:
+                rows = connection.execute("SELECT mac FROM devices WHERE known = 1 ORDER BY mac")
+            else:
+                rows = connection.execute("SELECT mac FROM devices WHERE known = 0 AND logged = 1 ORDER BY mac")
+            count = 0
+            with open(file_path, "w") as file:
+                for (mac,) in rows:
+                    file.write(f"{format_mac(mac)}\n")
+                    count += 1
+        finally:
+            connection.close()
+        return count
+
+    def recent_activity(self, period=24 * 3600):
+        """Return the figures of the "Recent activities" panel, from the indexed columns only."""
+        since = time.time() - period
+        connection = self._connect()
+        try:
+            last_seen, devices = connection.execute("SELECT max(last_seen), count(*) FROM devices").fetchone()
+            active = connection.execute("SELECT count(*) FROM devices WHERE last_seen >= ?", (since,)).fetchone()[0]
+            alerts = connection.execute("SELECT count(*) FROM alerts WHERE time >= ?", (since,)).fetchone()[0]
+        finally:
+            connection.close()
+        return {"last_seen": last_seen, "devices": devices, "active_devices": active, "recent_alerts": alerts}
+
+    def flush(self, timeout=5.0):
+        """Write everything recorded so far. Returns False if it took longer than timeout."""
+        done = threading.Event()
+        self.queue.put(("flush", done))
+        return done.wait(timeout)
+
+    def close(self, timeout=5.0):
+        """Write the pending changes and stop the writer thread."""
+        self.stopping = True
+        self.flush(timeout)
+        self.thread.join(timeout)
+
+    def _run(self):
+        connection = self._connect()
+        while True:
+            waiters = []
+            writes = []
+            try:
+                writes.append(self.queue.get(timeout=self.flush_interval))
+                while len(writes) < 10000:
+                    writes.append(self.queue.get_nowait())
+            except queue.Empty:
+                pass
+            with self.sightings_lock:
+                sightings, self.sightings = self.sightings, {}
+            try:
+                self._write(connection, sightings, writes, waiters)
+            except sqlite3.Error as e:
+                events.warning(f"Error writing the inventory database: {e}", key="inventory_error")
+            for waiter in waiters:
+                waiter.set()
+            if self.stopping and waiters:
+                connection.close()
+                return
+
+    def _write(self, connection, sightings, writes, waiters):
+        devices = {}  # mac -> [first seen, last seen, frames]
+        bindings = []
+        for (mac, ip), (first, last, frames) in sightings.items():
+            device = devices.get(mac)
+            if device is None:
+                devices[mac] = [first, last, frames]
+            else:
+                device[0] = min(device[0], first)
+                device[1] = max(device[1], last)
+                device[2] += frames
+            if ip is not None:
+                bindings.append((mac, ip, first, last))
+        statuses = [data for kind, data in writes if kind == "status"]
+        alerts = [data for kind, data in writes if kind == "alert"]
+        waiters.extend(data for kind, data in writes if kind == "flush")
+        if not (devices or statuses or alerts):
+            return
+        # One transaction for the whole batch
+        with connection:
+            connection.executemany(UPSERT_DEVICE_STATUS, statuses)
+            connection.executemany(UPSERT_DEVICE_SEEN, [(mac, *device) for mac, device in devices.items()])
+            connection.executemany(UPSERT_IP_BINDING, bindings)
+            connection.executemany("INSERT INTO alerts (time, severity, message) VALUES (?, ?, ?)", alerts)
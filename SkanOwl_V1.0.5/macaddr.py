@@ -0,0 +1,243 @@
+from array import array
+from bisect import bisect_right
+import csv
+import threading
+import events
+
+HEX_DIGITS = frozenset("0123456789abcdefABCDEF")
+
+def parse_mac(text):
+    """
+    Parse a MAC address into a 48-bit int.
+    Accepts aa:bb:cc:dd:ee:ff, AA-BB-CC-DD-EE-FF, aabb.ccdd.eeff and aabbccddeeff.
+    Returns None if text is not a MAC address.
+    """
+    digits = text.strip().replace(":", "").replace("-", "").replace(".", "")
+    if len(digits) != 12 or not HEX_DIGITS.issuperset(digits):
+        return None
+    return int(digits, 16)
+
+def mac_from_bytes(data):
+    """Convert the 6 bytes of a MAC address read from a frame into a 48-bit int."""
+    return int.from_bytes(data, "big")
+
+def format_mac(mac):
+    """Format a 48-bit int as the canonical aa:bb:cc:dd:ee:ff string."""
+    return mac.to_bytes(6, "big").hex(":")
+
+MIN_IMPLICIT_PREFIX_BITS = 24  # A prefix without /N must be at least a full OUI
+
+def parse_mac_prefix(text):
+    """
+    Parse a MAC prefix into (prefix, bits).
+    Accepts a partial address of at least an OUI such as aa:bb:cc (24 bits) or
+    aa:bb:cc:d (28 bits), and an address with an explicit prefix length such as
+    aa:bb:cc:d0:00:00/28. Shorter prefixes must be written with /N, so a stray
+    word such as "beef" cannot whitelist a whole address range.
+    Returns None if text is not a MAC prefix.
+    """
+    address, _, length = text.strip().partition("/")
+    digits = address.replace(":", "").replace("-", "").replace(".", "")
+    if not digits or len(digits) > 12 or not HEX_DIGITS.issuperset(digits):
+        return None
+    if length:
+        if not length.isdigit() or not 0 < int(length) <= 48:
+            return None
+        bits = int(length)
+        value = int(digits.ljust(12, "0"), 16)
+    else:
+        bits = len(digits) * 4
+        if bits < MIN_IMPLICIT_PREFIX_BITS:
+            return None
+        value = int(digits, 16) << (48 - bits)
+    return value >> (48 - bits), bits
+
+def read_mac_entries(file_path):
+    """
+    Return (macs, prefixes) read from a known MAC file.
+    Each line holds a full MAC address or a prefix (see parse_mac_prefix).
+    Blank lines and # comments are ignored; any other line is skipped with a
+    warning. The prefixes read are listed in one info line.
+    """
+    macs = set()
+    prefixes = set()
+    with open(file_path, "r") as file:
+        for number, line in enumerate(file, 1):
+            text = line.strip()
+            if not text or text.startswith("#"):
+                continue
+            mac = parse_mac(text)
+            if mac is not None:
+                macs.add(mac)
+                continue
+            prefix = parse_mac_prefix(text)
+            if prefix is not None:
+                prefixes.add(prefix)
+            else:
+                events.warning(f"{file_path}:{number}: skipped, not a MAC address or prefix: {text[:40]}",
+                               key=("invalid_mac_line", file_path, number))
+    if prefixes:
+        # One line per read, not a warning: a valid prefix is not a problem
+        ranges = ", ".join(format_mac_prefix(*prefix) for prefix in sorted(prefixes)[:5])
+        more = f" and {len(prefixes) - 5} more" if len(prefixes) > 5 else ""
+        events.info(f"{file_path}: {len(prefixes)} MAC ranges whitelisted: {ranges}{more}")
+    return macs, prefixes
+
+def format_mac_prefix(prefix, bits):
+    """Format (prefix, bits) as aa:bb:cc:00:00:00/24."""
+    return f"{format_mac(prefix << (48 - bits))}/{bits}"
+
+def read_mac_file(file_path):
+    """Return the MAC addresses of a file, one per line. Blank and invalid lines are skipped."""
+    macs = set()
+    with open(file_path, "r") as file:
+        for line in file:
+            mac = parse_mac(line)
+            if mac is not None:
+                macs.add(mac)
+    return macs
+
+class MacSet:
+    """
+    Set of MAC addresses stored as 48-bit ints.
+    Lookups read the current set without locking. Changes go through a lock,
+    so add() is an atomic check-and-add when several threads see the same address.
+    """
+    def __init__(self, macs=()):
+        self._macs = set(macs)
+        self._lock = threading.Lock()
+        self.version = 0  # Incremented on every change, lets consumers notice updates cheaply
+
+    def __contains__(self, mac):
+        return mac in self._macs
+
+    def __len__(self):
+        return len(self._macs)
+
+    def __iter__(self):
+        with self._lock:
+            return iter(self._macs.copy())
+
+    def add(self, mac):
+        """Add mac and return True, or return False if it was already present."""
+        with self._lock:
+            if mac in self._macs:
+                return False
+            self._macs.add(mac)
+            self.version += 1
+            return True
+
+    def update(self, macs):
+        """Add several MAC addresses."""
+        with self._lock:
+            self._macs.update(macs)
+            self.version += 1
+
+    def discard(self, mac):
+        """Remove mac if present."""
+        with self._lock:
+            self._macs.discard(mac)
+            self.version += 1
+
+    def replace(self, macs):
+        """Swap the whole content for macs in one step."""
+        new_macs = set(macs)
+        with self._lock:
+            self._macs = new_macs
+            self.version += 1
+
+    def apply(self, added, removed):
+        """Add and remove MAC addresses in one step: lookups see the old or the new set, never a mix."""
+        with self._lock:
+            new_macs = self._macs.difference(removed)
+            new_macs.update(added)
+            self._macs = new_macs
+            self.version += 1
+
+class MacPrefixIndex:
+    """
+    Index of MAC prefixes of any length, such as whole vendor ranges.
+    There is one hash table per prefix length, so a lookup costs one shift and
+    one set lookup for each length in use (at most 48).
+    """
+    def __init__(self, prefixes=()):
+        self._tables = ()
+        self.version = 0
+        self.replace(prefixes)
+
+    def __contains__(self, mac):
+        for shift, table in self._tables:
+            if mac >> shift in table:
+                return True
+        return False
+
+    def __len__(self):
+        return sum(len(table) for _, table in self._tables)
+
+    def replace(self, prefixes):
+        """Swap the content of the index for prefixes, an iterable of (prefix, bits)."""
+        tables = {}
+        for prefix, bits in prefixes:
+            tables.setdefault(48 - bits, set()).add(prefix)
+        # Longest prefixes first, the tables are replaced in one assignment
+        self._tables = tuple(sorted(tables.items()))
+        self.version += 1
+
+    def prefixes(self):
+        """Return the (prefix, bits) pairs of the index."""
+        return [(prefix, 48 - shift) for shift, table in self._tables for prefix in table]
+
+class VendorTable:
+    """
+    Vendor names of the IEEE registries (MA-L/OUI, MA-M and MA-S) kept in sorted
+    arrays: one array of prefixes and one array of name indexes per prefix length.
+    """
+    def __init__(self):
+        self._tables = ()  # (shift, prefixes, name indexes), longest prefixes first
+        self._names = []
+
+    def __len__(self):
+        return sum(len(prefixes) for _, prefixes, _ in self._tables)
+
+    def load_csv(self, file_path):
+        """
+        Load an IEEE registry CSV (oui.csv, mam.csv, oui36.csv) with the columns
+        Registry, Assignment, Organization Name, Organization Address.
+        Several files can be loaded one after the other.
+        """
+        entries = {}  # shift -> {prefix: name index}
+        for shift, prefixes, indexes in self._tables:
+            entries[shift] = dict(zip(prefixes, indexes))
+        name_indexes = {name: i for i, name in enumerate(self._names)}
+
+        with open(file_path, "r", encoding="utf-8", newline="") as file:
+            for row in csv.reader(file):
+                if len(row) < 3:
+                    continue
+                assignment = row[1].strip()
+                if not assignment or len(assignment) > 12 or not HEX_DIGITS.issuperset(assignment):
+                    continue  # Header line or malformed entry
+                name = row[2].strip()
+                index = name_indexes.get(name)
+                if index is None:
+                    index = name_indexes[name] = len(self._names)
+                    self._names.append(name)
+                shift = 48 - len(assignment) * 4
+                entries.setdefault(shift, {})[int(assignment, 16)] = index
+
+        tables = []
+        for shift in sorted(entries):
+            table = entries[shift]
+            prefixes = array("Q", sorted(table))
+            indexes = array("I", (table[prefix] for prefix in prefixes))
+            tables.append((shift, prefixes, indexes))
+        self._tables = tuple(tables)
+
+    def lookup(self, mac):
+        """Return the vendor name of mac, or None if its prefix is not registered."""
+        for shift, prefixes, indexes in self._tables:
+            prefix = mac >> shift
+            i = bisect_right(prefixes, prefix) - 1
+            if i >= 0 and prefixes[i] == prefix:
+                return self._names[indexes[i]]
+        return None
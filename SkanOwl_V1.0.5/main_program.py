@@ -1,196 +1,653 @@
-from PyQt5.QtWidgets import QFileDialog
 from scapy.all import sniff
-from scapy.layers.inet import IP, Ether
-from scapy.layers.l2 import ARP
+from functools import partial
 import threading
+import time
 import os
+import capture
+import events
+import whriteresults
+import multicapture
+import bpffilter
+from inventory import Inventory
+from notifsmails import MailNotifier
+from filewatch import FileWatcher
+import arpscan
+import metrics
+from traffic import TrafficAccounting
+from session import SessionManager
+from macaddr import MacSet, MacPrefixIndex, VendorTable, format_mac, read_mac_entries, read_mac_file
+import config
+from arpwatch import ArpBindingTable
 
 # Global variables for file paths
 known_mac_file = ""  # Path to the file of known MAC addresses
 unknown_mac_file = ""  # Path to the file of unknown MAC addresses
 
-# Variable to control program execution
-running = True
-monitoring_running = False  # To track if network monitoring is running
-monitoring_event = threading.Event()  # Event to control thread termination
-monitoring_threads = []  # To store monitoring threads
-
-# For storing previously detected MAC addresses to avoid redundant logs
-known_macs_set = set()
-unknown_macs_set = set()
+# Capture jobs ("acquisition", "monitoring"), each with its own cancellation token
+session = SessionManager(config.stop_timeout)
+ACQUISITION = "MAC acquisition"
+MONITORING = "Network monitoring"
+
+# Capture settings
+capture_iface = None  # Interface to capture on (None = scapy default interface)
+persistent_capture = True  # Keep one capture socket open for the whole session instead of re-entering sniff()
+capture_backend = "scapy"  # "scapy" dissects every frame, "raw" decodes only the fields the detectors read
+capture_processes = 1  # Above 1, raw frames are decoded in this many worker processes (see multicapture)
+bpf_exclude_known = False  # Monitoring only: drop the IPv4 traffic of known devices in the kernel (see bpffilter)
+
+# For storing previously detected MAC addresses to avoid redundant logs (48-bit ints, see macaddr)
+known_macs_set = MacSet()
+unknown_macs_set = MacSet()
+known_prefixes = MacPrefixIndex()  # Known vendor ranges and masks (e.g. all IP phones)
+known_mac_hits = {}  # Frames seen per known MAC, the busiest ones are excluded first by the kernel filter
+known_file_macs = set()  # Content of the known MAC file at the last read, to apply only the changes
+known_file_lock = threading.Lock()
+known_file_watcher = None  # Re-reads the known MAC file when it changes (see config.watch_mac_files)
+
+# IP -> MAC bindings learnt from ARP traffic, bounded in size and age
+arp_bindings = ArpBindingTable(config.arp_table_size, config.arp_binding_ttl, config.arp_max_ips_per_mac)
+
+# Vendor names from the IEEE registry, used to describe unknown devices
+vendor_table = VendorTable()
+
+# Bytes and frames per device, with the top talkers of the last minute, 5 minutes and hour
+traffic = TrafficAccounting(config.traffic_windows, config.traffic_sketch_width, config.traffic_sketch_depth,
+                            config.traffic_top_candidates)
+
+# Optional SQLite device inventory (see open_inventory)
+inventory = None
+
+# Optional email delivery of the alerts (see open_mail_notifier)
+mail_notifier = None
+
+# Detector registry: every captured frame is dissected once and handed to each detector in turn
+detectors = ()  # (name, function) pairs, replaced as a whole on (un)registration
+detector_stats = {}  # name -> [frames processed, total seconds spent]
+detectors_lock = threading.Lock()
+detector_latency = {}  # name -> metrics.Histogram of the time spent per frame
+LATENCY_SAMPLE_EVERY = 16  # Latencies are put in the histograms for one frame in 16
+dispatched_frames = 0
 
 # Function to start MAC acquisition
 def start_mac_acquisition_thread():
-    """Start MAC address acquisition thread."""
-    global monitoring_event
-    print("[*] Starting MAC address acquisition thread...\n")
-    monitoring_event.clear()  # Ensure the event is cleared before starting
-    thread = threading.Thread(target=run_program)
-    thread.daemon = True  # Allow thread to exit when the program ends
-    thread.start()
-
-def stop_all_threads():
-    """Stop the program and all threads."""
-    global running, monitoring_event
-    running = False
-    monitoring_event.set()  # Signal all threads to stop
-    print("[*] Stopping all threads...\n")
-
-def controlled_sniff(filter, prn, store=0, timeout=1):
-    """
-    Sniff packets with the ability to stop using the monitoring_event.
-    """
-    while not monitoring_event.is_set():
+    """Start MAC address acquisition in its own capture job."""
+    stats = capture.new_capture_stats()
+    if not session.start(ACQUISITION, partial(run_program, stats=stats), cleanup=flush_results, stats=stats):
+        events.info("MAC address acquisition is already running.")
+
+def stop_mac_acquisition(wait=False):
+    """Stop MAC address acquisition, without touching network monitoring."""
+    session.stop(ACQUISITION, wait)
+
+def stop_all_threads(wait=False):
+    """Stop every capture job. Returns at once unless wait is set."""
+    events.info("Stopping all threads...")
+    if session.stop_all(wait):
+        return  # The jobs write their results in their own cleanup
+    if wait:
+        flush_results()
+    else:
+        # Nothing was running: flush anyway, but off the calling (GUI) thread, like a job cleanup
+        threading.Thread(target=flush_results, name="skanowl-flush", daemon=True).start()
+
+def flush_results():
+    """Write the pending unknown/known MACs, inventory changes and event summaries."""
+    whriteresults.mac_writer.flush()
+    flush_inventory()
+    events.flush()
+
+def controlled_sniff(filter, prn, stop_event, store=0, timeout=1, exclude_known=False, stats=None):
+    """
+    Sniff packets until stop_event is set, counting the frames in stats (the counters of the job).
+    With exclude_known, the known devices are filtered in the kernel if bpf_exclude_known is set.
+    """
+    filter, filter_updates = capture_filter(filter) if exclude_known else (filter, None)
+    if capture_backend == "raw":
+        capture.raw_sniff(prn, stop_event, iface=capture_iface, filter=filter, filter_updates=filter_updates, stats=stats)
+        return
+    if persistent_capture:
+        capture.persistent_sniff(filter, prn, stop_event, iface=capture_iface, filter_updates=filter_updates, stats=stats)
+        return
+    while not stop_event.is_set():
         sniff(filter=filter, prn=prn, store=store, timeout=timeout)
 
-def start_network_monitoring_threads():
-    """Start or stop threads for network monitoring."""
-    global monitoring_running, monitoring_event, monitoring_threads
+def capture_filter(filter):
+    """
+    Return the capture filter to start with and the callable polled by the capture
+    loop for filter updates (None when the known devices are not filtered in the kernel).
+    """
+    if not bpf_exclude_known:
+        return filter, None
+    exclusion = bpffilter.ExclusionFilter(filter, known_macs_set, known_prefixes, known_mac_hits)
+    return exclusion.build(), exclusion.poll
+
+def fanout_sniff(filter, stop_event, stats=None):
+    """
+    Capture raw frames and decode them in capture_processes worker processes.
+    The workers report per-source sums (see record_sources); ARP frames go through
+    the detectors in this process.
+    """
+    filter, filter_updates = capture_filter(filter)
+    worker_stats = multicapture.fanout_sniff(stop_event, capture_processes, record_sources, dispatch_packet,
+                                             iface=capture_iface, filter=filter, filter_updates=filter_updates,
+                                             stats=stats)
+    merge_detector_stats(worker_stats)
 
-    if monitoring_running:
-        print("[*] Network monitoring is already running. Stopping...\n")
+def merge_detector_stats(worker_stats):
+    """
+    Put the statistics of the worker processes in detector_stats. They cover one
+    capture or replay, so they replace those of the previous run.
+    """
+    for name, (frames, seconds) in worker_stats.items():
+        detector_stats[name] = [frames, seconds]
+
+def register_detector(func, name=None):
+    """Register a detector called with every frame captured during network monitoring."""
+    global detectors
+    name = name or func.__name__
+    with detectors_lock:
+        detectors = tuple(d for d in detectors if d[0] != name) + ((name, func),)
+        detector_stats[name] = [0, 0.0]
+        labels = {"detector": name}
+        detector_latency[name] = metrics.histogram("skanowl_detector_latency_seconds",
+                                                   "Time a detector spends on one frame (sampled)", labels)
+        metrics.callback("skanowl_detector_frames_total", "Frames processed by a detector",
+                         lambda: detector_stats.get(name, (0,))[0], "counter", labels)
+    return func
+
+def unregister_detector(name):
+    """Remove a detector from the monitoring chain."""
+    global detectors
+    with detectors_lock:
+        detectors = tuple(d for d in detectors if d[0] != name)
+        detector_stats.pop(name, None)
+        detector_latency.pop(name, None)
+        metrics.unregister("skanowl_detector_latency_seconds", {"detector": name})
+        metrics.unregister("skanowl_detector_frames_total", {"detector": name})
+
+def dispatch_packet(pkt):
+    """Hand a captured frame to every registered detector and account the time each one takes."""
+    global dispatched_frames
+    frame = capture.as_frame(pkt)
+    dispatched_frames += 1
+    sample = dispatched_frames % LATENCY_SAMPLE_EVERY == 0
+    for name, func in detectors:
+        start = time.perf_counter()
+        try:
+            func(frame)
+        except Exception as e:
+            events.warning(f"Detector {name} failed: {e}", key=("detector_error", name))
+        elapsed = time.perf_counter() - start
+        stats = detector_stats.get(name)
+        if stats is not None:
+            stats[0] += 1
+            stats[1] += elapsed
+        if sample:
+            histogram = detector_latency.get(name)
+            if histogram is not None:
+                histogram.observe(elapsed)
+
+def print_detector_stats():
+    """Print the number of frames and the time spent in each detector (and in the worker processes)."""
+    for name, (frames, seconds) in list(detector_stats.items()):
+        average = (seconds / frames * 1e6) if frames else 0.0
+        events.info(f"Detector {name}: {frames} frames, {seconds * 1000:.1f} ms total, {average:.1f} us/frame")
+
+def monitoring_stats():
+    """Return the live figures of the statistics panel (frames, drops, writer queue, detector latencies)."""
+    latencies = {}
+    for name, _ in detectors:
+        histogram = detector_latency.get(name)
+        frames = detector_stats.get(name, (0,))[0]
+        if histogram is not None:
+            latencies[name] = (frames, histogram.quantile(0.5), histogram.quantile(0.99))
+    stats = session.stats(MONITORING)
+    return {"frames": stats.get("frames", 0), "kernel_drops": stats.get("kernel_drops", 0),
+            "writer_queue": whriteresults.mac_writer.pending(), "detectors": latencies}
+
+def start_metrics_server(port):
+    """Serve the metrics in the Prometheus text format on 127.0.0.1:port."""
+    try:
+        server = metrics.start_http_server(port)
+    except OSError as e:
+        events.warning(f"Could not start the metrics endpoint on port {port}: {e}")
+        return None
+    events.info(f"Metrics available on http://127.0.0.1:{port}/metrics")
+    return server
+
+def start_network_monitoring_threads():
+    """Start network monitoring, or stop it if it is running."""
+    if session.is_active(MONITORING):
+        events.info("Network monitoring is already running. Stopping...")
         stop_network_monitoring()
+        return
+    stats = capture.new_capture_stats()
+    session.start(MONITORING, partial(monitor_network, stats=stats), partial(finish_network_monitoring, stats), stats)
+
+def monitor_network(stop_event, stats=None):
+    """Capture job of network monitoring: a single capture loop feeds every registered detector."""
+    if capture_processes > 1:
+        fanout_sniff("ip or arp", stop_event, stats)
     else:
-        print("[*] Starting network monitoring threads...\n")
-        monitoring_running = True
-        monitoring_event.clear()  # Reset the event
-
-        # Creating threads for network monitoring tasks
-        threads = []
-
-        # Thread for MAC comparison
-        mac_thread = threading.Thread(target=controlled_sniff, kwargs={
-            "filter": "ip",
-            "prn": compare_src_mac_with_known_mac_file
-        })
-        threads.append(mac_thread)
-
-        # Thread for ARP spoofing detection
-        arp_thread = threading.Thread(target=controlled_sniff, kwargs={
-            "filter": "arp",
-            "prn": detect_arp_spoofing
-        })
-        threads.append(arp_thread)
-
-        # Thread for MAC spoofing detection
-        spoofing_thread = threading.Thread(target=controlled_sniff, kwargs={
-            "filter": "arp",
-            "prn": detect_mac_spoofing
-        })
-        threads.append(spoofing_thread)
-
-        # Start all threads
-        for thread in threads:
-            thread.start()
-
-        monitoring_threads = threads
-
-def stop_network_monitoring():
-    """Stop the network monitoring threads."""
-    global monitoring_running, monitoring_event, monitoring_threads
-
-    monitoring_event.set()  # Signal the threads to stop
-    monitoring_running = False
-    print("[*] Stopping network monitoring...\n")
-
-    for thread in monitoring_threads:
-        if thread.is_alive():
-            thread.join()
-
-    monitoring_threads.clear()
-    print("[*] All monitoring threads stopped.\n")
+        controlled_sniff("ip or arp", dispatch_packet, stop_event, exclude_known=True, stats=stats)
+
+def stop_network_monitoring(wait=False):
+    """Stop network monitoring. Returns at once; the capture thread writes the results when it ends."""
+    session.stop(MONITORING, wait)
+
+def restart_network_monitoring():
+    """
+    Start a new monitoring capture without waiting for the current one to close
+    (the Restart Monitoring button, e.g. after the interface came back up).
+    """
+    stats = capture.new_capture_stats()  # The run being stopped keeps its own counters
+    session.restart(MONITORING, partial(monitor_network, stats=stats), partial(finish_network_monitoring, stats), stats)
+
+def finish_network_monitoring(stats):
+    """Cleanup of the monitoring job, run in its own thread once the capture loop returned."""
+    flush_results()
+    events.info(f"Frames captured: {stats['frames']}, dropped by the kernel: {stats['kernel_drops']}")
+    print_detector_stats()
 
 def select_known_mac(file_path):
-    """Set the file for known MAC addresses."""
-    global known_mac_file, known_macs_set
+    """Set the file for known MAC addresses; it replaces the list of the previous file."""
+    global known_mac_file, known_file_watcher
 
     if os.path.exists(file_path):
         known_mac_file = file_path
-        print(f"[+] Selected known MAC file: {known_mac_file}\n")
+        events.info(f"Selected known MAC file: {known_mac_file}")
+        load_known_mac(file_path)
+        if known_file_watcher is not None:
+            known_file_watcher.stop()
+            known_file_watcher = None
+        if config.watch_mac_files:
+            known_file_watcher = FileWatcher(file_path, load_known_mac, config.watch_interval)
+    else:
+        events.warning("The selected file does not exist.")
 
-        # Load existing MAC addresses into the set
+def load_known_mac(file_path):
+    """
+    Read the known MAC file and apply only the addresses added or removed since the
+    last read, in one atomic swap: the capture goes on and never sees a partial list.
+    Addresses learnt elsewhere (acquisition, inventory) are kept.
+    """
+    global known_file_macs
+    with known_file_lock:
         try:
-            with open(known_mac_file, "r") as file:
-                known_macs_set.update(line.strip() for line in file)
-            print(f"[+] Loaded {len(known_macs_set)} MAC addresses from the file.\n")
+            macs, prefixes = read_mac_entries(file_path)
         except Exception as e:
-            print(f"[!] Error reading known MAC file: {e}\n")
+            events.warning(f"Error reading known MAC file: {e}")
+            return
+        added = macs - known_file_macs
+        removed = known_file_macs - macs
+        known_macs_set.apply(added, removed)
+        if set(known_prefixes.prefixes()) != prefixes:
+            known_prefixes.replace(prefixes)
+        known_file_macs = macs
+    if inventory is not None:
+        for mac in added:
+            inventory.set_status(mac, known=True)
+        for mac in removed:
+            inventory.set_status(mac, known=False)
+    events.info(f"Known MAC list: {len(added)} added, {len(removed)} removed, "
+                f"{len(known_macs_set)} MAC addresses and {len(known_prefixes)} prefixes in use.")
+
+def reload_known_mac():
+    """Read the known MAC file again, e.g. after it was edited."""
+    if known_mac_file:
+        load_known_mac(known_mac_file)
     else:
-        print("[!] The selected file does not exist.\n")
+        events.warning("Known MAC file not set, nothing to reload.")
 
 def select_unknown_mac(file_path):
-    """Set the file for unknown MAC addresses."""
+    """Set the file for unknown MAC addresses; the addresses already in it are not logged again."""
     global unknown_mac_file
 
     if os.path.exists(file_path):
         unknown_mac_file = file_path
-        print(f"[+] Selected unknown MAC file: {unknown_mac_file}\n")
+        events.info(f"Selected unknown MAC file: {unknown_mac_file}")
+        try:
+            macs = read_mac_file(file_path)
+        except Exception as e:
+            events.warning(f"Error reading unknown MAC file: {e}")
+            return
+        if inventory is not None:
+            macs.update(inventory.load_index()[1])  # Also logged before, in another file
+        unknown_macs_set.replace(macs)  # The addresses of a previously selected file no longer count
+        events.info(f"Loaded {len(macs)} unknown MAC addresses already logged.")
     else:
-        print("[!] The selected file does not exist.\n")
+        events.warning("The selected file does not exist.")
+
+def open_inventory(file_path):
+    """Open the SQLite inventory and load its compact index of known/unknown MACs."""
+    global inventory
+    try:
+        new_inventory = Inventory(file_path)
+        known, unknown = new_inventory.load_index()
+    except Exception as e:
+        events.warning(f"Error opening the inventory database: {e}")
+        return
+    close_inventory()
+    inventory = new_inventory
+    known_macs_set.update(known)
+    unknown_macs_set.update(unknown)
+    events.pipeline.add_handler(inventory.record_event)
+    events.info(f"Opened inventory {file_path}: {len(known)} known devices and {len(unknown)} unknown devices already logged.")
+
+def close_inventory():
+    """Write the pending inventory changes and close it."""
+    global inventory
+    if inventory is not None:
+        events.pipeline.remove_handler(inventory.record_event)
+        inventory.close()
+        inventory = None
+
+def flush_inventory():
+    """Write the pending inventory changes now."""
+    if inventory is not None:
+        inventory.flush()
+
+def recent_activity():
+    """Return the "Recent activities" figures of the inventory, or None without an inventory."""
+    if inventory is None:
+        return None
+    return inventory.recent_activity()
+
+def open_mail_notifier():
+    """Send the alerts by email with the SMTP settings of config."""
+    global mail_notifier
+    close_mail_notifier()
+    mail_notifier = MailNotifier(config.mail_sender, config.mail_recipients, config.smtp_host, config.smtp_port,
+                                 config.smtp_username, config.smtp_password, config.smtp_starttls,
+                                 digest_size=config.mail_digest_size, digest_interval=config.mail_digest_interval,
+                                 queue_size=config.mail_queue_size)
+    events.pipeline.add_handler(mail_notifier.record_event)
+    events.info(f"Alerts will be mailed to {', '.join(config.mail_recipients)} through {config.smtp_host}")
+
+def close_mail_notifier():
+    """Send the pending alert mails and stop the notifier."""
+    global mail_notifier
+    if mail_notifier is not None:
+        events.pipeline.remove_handler(mail_notifier.record_event)
+        mail_notifier.stop()
+        mail_notifier = None
+
+def load_vendor_table(file_path):
+    """Load the vendor names of an IEEE registry CSV file."""
+    try:
+        vendor_table.load_csv(file_path)
+        events.info(f"Loaded {len(vendor_table)} vendor prefixes from {file_path}")
+    except Exception as e:
+        events.warning(f"Error reading vendor file: {e}")
+
+def describe_vendor(mac):
+    """Return the vendor name of mac for alerts."""
+    return vendor_table.lookup(mac) or "unknown vendor"
 
 def compare_src_mac_with_known_mac_file(pkt):
     """Compare source MAC addresses with known addresses."""
     global known_mac_file, unknown_mac_file, known_macs_set, unknown_macs_set
 
-    if pkt.haslayer(IP) and pkt.haslayer(Ether):
-        src_ip = pkt[IP].src
-        src_mac = pkt[Ether].src
-
-        if src_mac in known_macs_set:
-            print(f"[+] Known MAC address detected: {src_mac} (IP: {src_ip})\n")
-        else:
-            if unknown_mac_file and src_mac not in unknown_macs_set:
-                try:
-                    with open(unknown_mac_file, "a") as file:
-                        file.write(f"{src_mac}\n")
-                    unknown_macs_set.add(src_mac)
-                    print(f"[*] Added unknown MAC address: {src_mac}\n")
-                except Exception as e:
-                    print(f"[!] Error writing to unknown MAC file: {e}\n")
-            else:
-                print(f"[!] Unknown MAC address already logged: {src_mac}\n")
+    frame = capture.as_frame(pkt)
+    if frame.ip_src and frame.src_mac is not None:
+        src_ip = frame.ip_src
+        src_mac = frame.src_mac
+
+        if inventory is not None:
+            inventory.record_sighting(src_mac, src_ip)
+
+        if src_mac in known_macs_set or src_mac in known_prefixes:
+            known_mac_hits[src_mac] = known_mac_hits.get(src_mac, 0) + 1
+            events.tally("known MACs", src_mac)
+        elif not log_unknown_mac(src_mac, src_ip):
+            events.tally("unknown MACs already logged", src_mac)
+
+def log_unknown_mac(mac, ip):
+    """Log mac as a new unknown device. Returns False if it was already logged or no unknown file is set."""
+    # add() is an atomic check-and-add, so each unknown MAC is logged once
+    if not (unknown_mac_file and unknown_macs_set.add(mac)):
+        return False
+    if inventory is not None:
+        inventory.set_status(mac, known=False, vendor=vendor_table.lookup(mac), logged=True)
+    whriteresults.mac_writer.write(unknown_mac_file, f"{format_mac(mac)}\n")
+    events.warning(f"Added unknown MAC address: {format_mac(mac)} ({describe_vendor(mac)}, IP: {ip})", key=("unknown_mac", mac))
+    return True
+
+def record_sources(sources):
+    """
+    Apply the sums reported by the detector worker processes, {(MAC, IP): [first seen,
+    last seen, frames, bytes]}: the work of compare_src_mac_with_known_mac_file and
+    account_traffic, done once per source and report instead of once per frame.
+    """
+    known = {}
+    already_logged = {}
+    if inventory is not None:
+        inventory.record_sightings({key: entry[:3] for key, entry in sources.items()})
+    for (mac, ip), (_, last, frames, sent) in sources.items():
+        traffic.add(mac, ip, sent, now=last, frames=frames)
+        if mac in known_macs_set or mac in known_prefixes:
+            known_mac_hits[mac] = known_mac_hits.get(mac, 0) + frames
+            known[mac] = known.get(mac, 0) + frames
+        elif not log_unknown_mac(mac, ip):
+            already_logged[mac] = already_logged.get(mac, 0) + frames
+    tallies = {"known MACs": known, "unknown MACs already logged": already_logged}
+    events.pipeline.merge_tallies({category: counts for category, counts in tallies.items() if counts})
+
+def account_traffic(pkt):
+    """Count the bytes and frames sent by the source MAC and IP of the frame."""
+    frame = capture.as_frame(pkt)
+    if frame.src_mac is not None:
+        traffic.add(frame.src_mac, frame.ip_src, frame.length, now=frame.time)
+
+def top_talkers(n=10, period=60):
+    """Return [(MAC, vendor, bytes, frames)] of the n devices that sent the most in the window."""
+    return [(format_mac(mac), describe_vendor(mac), sent, frames)
+            for mac, sent, frames in traffic.top_talkers(n, period)]
+
+def print_top_talkers(n=10, period=60):
+    for mac, vendor, sent, frames in top_talkers(n, period):
+        events.info(f"Top talker {mac} ({vendor}): {sent:,} bytes, {frames:,} frames")
 
 def write_mac_to_sd(pkt):
     """Write captured MAC addresses to the known MAC file."""
     global known_mac_file, known_macs_set
 
     if not known_mac_file:
-        print("[!] Known MAC file not set. Please select a file first.\n")
+        events.warning("Known MAC file not set. Please select a file first.", key="known_mac_file_not_set")
         return
 
-    if pkt.haslayer(Ether):
-        src_mac = pkt[Ether].src
-
-        if src_mac not in known_macs_set:
-            try:
-                with open(known_mac_file, "a") as file:
-                    file.write(f"{src_mac}\n")
-                known_macs_set.add(src_mac)
-                print(f"[+] MAC address written to file: {src_mac}\n")
-            except Exception as e:
-                print(f"[!] Error writing to file: {e}\n")
+    frame = capture.as_frame(pkt)
+    if frame.src_mac is not None:
+        src_mac = frame.src_mac
+
+        if known_macs_set.add(src_mac):
+            if inventory is not None:
+                inventory.set_status(src_mac, known=True, vendor=vendor_table.lookup(src_mac))
+            whriteresults.mac_writer.write(known_mac_file, f"{format_mac(src_mac)}\n")
+            events.info(f"MAC address written to file: {format_mac(src_mac)}", key=("acquired_mac", src_mac))
         else:
-            print(f"[*] MAC address already exists: {src_mac}\n")
+            events.tally("MACs already in the known file", src_mac)
 
 def detect_arp_spoofing(pkt):
-    """Detect ARP spoofing attempts."""
-    if pkt.haslayer(ARP) and pkt[ARP].op == 2:  # ARP reply
-        source_ip = pkt[ARP].psrc
-        source_mac = pkt[ARP].hwsrc
-        print(f"[!] ARP Spoofing Check: IP={source_ip}, MAC={source_mac}\n")
+    """Detect ARP spoofing attempts: an IP whose MAC changes, or a MAC claiming many IPs."""
+    frame = capture.as_frame(pkt)
+    if frame.arp_op in (1, 2) and frame.arp_hwsrc is not None:  # ARP request or reply
+        source_ip = frame.arp_psrc
+        if source_ip == "0.0.0.0":
+            return  # ARP probe, the sender does not claim any address yet
+        gratuitous = source_ip == frame.arp_pdst
+
+        for alert in arp_bindings.observe(source_ip, frame.arp_hwsrc, gratuitous, now=frame.time):
+            kind = "gratuitous ARP" if alert.gratuitous else "ARP"
+            if alert.kind == "binding_changed":
+                events.alert(f"ARP Spoofing detected! IP={alert.ip} moved from {format_mac(alert.old_mac)} to {format_mac(alert.new_mac)} ({kind}, change #{alert.count})",
+                             key=("arp_binding_changed", alert.ip, alert.new_mac))
+            else:
+                events.alert(f"ARP Spoofing suspected! MAC={format_mac(alert.new_mac)} claims {alert.count} IP addresses (last: {alert.ip})",
+                             key=("arp_many_ips", alert.new_mac))
 
 def detect_mac_spoofing(pkt):
     """Detect MAC spoofing."""
-    if pkt.haslayer(Ether) and pkt.haslayer(ARP):
-        ethernet_mac = pkt[Ether].src
-        arp_mac = pkt[ARP].hwsrc
+    frame = capture.as_frame(pkt)
+    if frame.src_mac is not None and frame.arp_op is not None:
+        ethernet_mac = frame.src_mac
+        arp_mac = frame.arp_hwsrc
 
         if ethernet_mac != arp_mac:
-            print(f"[!] MAC Spoofing detected! Ethernet MAC: {ethernet_mac}, ARP MAC: {arp_mac}\n")
-
-def run_program():
-    """Start capturing packets for MAC address acquisition."""
-    global running
-    running = True
-    print("[*] Starting MAC address acquisition...\n")
-    controlled_sniff(filter="ip", prn=write_mac_to_sd)
+            events.alert(f"MAC Spoofing detected! Ethernet MAC: {format_mac(ethernet_mac)}, ARP MAC: {format_mac(arp_mac)}",
+                         key=("mac_spoofing", ethernet_mac, arp_mac))
+
+def quick_scan(network=None, progress=None, stop_event=None):
+    """
+    Discover the devices of a subnet with an ARP sweep and sort them into known and unknown.
+    Returns (known devices, unknown devices), or None if the scan could not run.
+    """
+    try:
+        network = network or config.quick_scan_network or arpscan.default_network(capture_iface)
+        events.info(f"Quick scan of {network}...")
+        found = arpscan.arp_sweep(network, iface=capture_iface, rate=config.quick_scan_rate,
+                                  progress=progress, stop_event=stop_event)
+    except Exception as e:
+        events.warning(f"Quick scan failed: {e}")
+        return None
+
+    known = unknown = 0
+    for ip, mac in found.items():
+        if inventory is not None:
+            inventory.record_sighting(mac, ip)
+        if mac in known_macs_set or mac in known_prefixes:
+            known += 1
+            continue
+        unknown += 1
+        log_unknown_mac(mac, ip)
+    events.info(f"Quick scan of {network} finished: {len(found)} devices, {known} known, {unknown} unknown.")
+    return known, unknown
+
+def start_replay():
+    """
+    Clear the traffic windows and ARP bindings before replaying a capture file:
+    during the replay they follow the record timestamps, not the live clock.
+    """
+    traffic.reset(float("-inf"))  # The first record opens the windows at its own time
+    arp_bindings.clear()
+
+def end_replay():
+    """Forget the ARP bindings of the replay, their times would never expire on the live clock."""
+    arp_bindings.clear()
+
+def analyze_capture_file(file_path, summary_only=False, processes=1):
+    """
+    Replay a pcap/pcapng file through the detector chain, streaming it one frame at a time.
+    Traffic windows and ARP binding ages follow the record timestamps, so the top
+    talkers reported are those of the last minute of the capture.
+    With summary_only, the detectors are skipped and only traffic counts are reported.
+    With processes above 1, the frames are decoded in that many worker processes.
+    Returns the counters of the pass.
+    """
+    if processes > 1 and not summary_only:
+        return analyze_capture_file_parallel(file_path, processes)
+    stats = {"frames": 0, "bytes": 0, "ip_frames": 0, "arp_frames": 0, "seconds": 0.0}
+    source_macs = set()
+    events.info(f"Analyzing {file_path}...")
+    if not summary_only:
+        start_replay()
+    start = time.perf_counter()
+    try:
+        for timestamp, data in capture.iter_capture_records(file_path):
+            stats["frames"] += 1
+            stats["bytes"] += len(data)
+            frame = capture.decode_frame(data, timestamp)
+            if frame is None:
+                continue
+            if frame.ip_src:
+                stats["ip_frames"] += 1
+            else:
+                stats["arp_frames"] += 1
+            if summary_only:
+                source_macs.add(frame.src_mac)
+            else:
+                dispatch_packet(frame)
+    except (OSError, ValueError) as e:
+        events.warning(f"Error reading capture file: {e}")
+    stats["seconds"] = elapsed = time.perf_counter() - start
+
+    rate = stats["frames"] / elapsed if elapsed else 0.0
+    events.info(f"Analyzed {stats['frames']:,} frames ({stats['bytes'] / 1e6:.1f} MB) in {elapsed:.2f} s: "
+                f"{rate:,.0f} frames/s, {stats['bytes'] / 1e6 / elapsed if elapsed else 0.0:.1f} MB/s")
+    if summary_only:
+        known = sum(1 for mac in source_macs if mac in known_macs_set or mac in known_prefixes)
+        stats["source_macs"] = len(source_macs)
+        stats["known_macs"] = known
+        events.info(f"{stats['ip_frames']:,} IPv4 and {stats['arp_frames']:,} ARP frames from {len(source_macs):,} MAC addresses "
+                    f"({known:,} known, {len(source_macs) - known:,} unknown)")
+    else:
+        whriteresults.mac_writer.flush()
+        flush_inventory()
+        events.flush()
+        print_detector_stats()
+        print_top_talkers()
+        end_replay()
+    return stats
+
+def analyze_capture_file_parallel(file_path, processes):
+    """Replay a pcap/pcapng file through worker processes (see fanout_sniff)."""
+    events.info(f"Analyzing {file_path} with {processes} processes...")
+    start_replay()
+    try:
+        frames, elapsed, worker_stats = multicapture.fanout_capture_file(file_path, processes, record_sources, dispatch_packet)
+    except (OSError, ValueError) as e:
+        events.warning(f"Error reading capture file: {e}")
+        end_replay()
+        return {"frames": 0, "seconds": 0.0}
+    merge_detector_stats(worker_stats)
+    rate = frames / elapsed if elapsed else 0.0
+    events.info(f"Analyzed {frames:,} frames in {elapsed:.2f} s: {rate:,.0f} frames/s")
+    whriteresults.mac_writer.flush()
+    flush_inventory()
+    events.flush()
+    print_detector_stats()
+    print_top_talkers()
+    end_replay()
+    return {"frames": frames, "seconds": elapsed}
+
+def run_program(stop_event, stats=None):
+    """Capture job of MAC address acquisition, until stop_event is set."""
+    events.info("Starting MAC address acquisition...")
+    controlled_sniff(filter="ip", prn=write_mac_to_sd, stop_event=stop_event, stats=stats)
+
+def load_config():
+    """
+    Open the files and services set in config (vendor table, inventory, mail, MAC files).
+    Called once by the entry points; importing this module has no such side effect,
+    so a process that only imports it (e.g. a multiprocessing child) opens nothing.
+    """
+    if config.oui_csv_file:
+        load_vendor_table(config.oui_csv_file)
+    if config.inventory_db_file:
+        open_inventory(config.inventory_db_file)
+    if config.smtp_host and config.mail_recipients:
+        open_mail_notifier()
+    if config.known_mac_file:
+        select_known_mac(config.known_mac_file)
+    if config.unknown_mac_file:
+        select_unknown_mac(config.unknown_mac_file)
+
+def job_counter(name, key):
+    """Return a function reading a capture counter of the current run of job name."""
+    return lambda: session.stats(name).get(key, 0)
+
+# Counters the program keeps anyway, read only when the metrics are collected (per job, reset on each run)
+for job_name in (ACQUISITION, MONITORING):
+    labels = {"job": job_name}
+    metrics.callback("skanowl_frames_captured_total", "Frames read from the capture socket",
+                     job_counter(job_name, "frames"), "counter", labels)
+    metrics.callback("skanowl_kernel_drops_total", "Frames dropped by the kernel before they were read",
+                     job_counter(job_name, "kernel_drops"), "counter", labels)
+metrics.callback("skanowl_writer_queue_depth", "MAC addresses waiting to be written to the unknown file",
+                 lambda: whriteresults.mac_writer.pending())
+
+# Default detector chain for network monitoring
+register_detector(compare_src_mac_with_known_mac_file)
+register_detector(detect_arp_spoofing)
+register_detector(detect_mac_spoofing)
+register_detector(account_traffic)
@@ -0,0 +1,165 @@
+"""
+Lightweight instrumentation: counters, callback values and latency histograms,
+exposed in the Prometheus text format on a loopback-only HTTP endpoint.
+
+Most values are read from counters the program already keeps (callbacks are
+only evaluated when the metrics are read), so the capture hot path only pays
+for sampled histogram observations.
+"""
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import ipaddress
+import threading
+
+# Latency buckets from 1 us to 1 s (upper bounds, in seconds)
+LATENCY_BUCKETS = (1e-6, 2e-6, 5e-6, 1e-5, 2e-5, 5e-5, 1e-4, 2e-4, 5e-4, 1e-3, 2e-3, 5e-3, 1e-2, 2e-2, 5e-2, 0.1, 0.2, 0.5, 1.0)
+
+class Counter:
+    """Monotonic counter incremented by the program."""
+    kind = "counter"
+
+    def __init__(self):
+        self.count = 0
+
+    def inc(self, amount=1):
+        self.count += amount  # No lock: an increment lost to a race is acceptable for a metric
+
+    def value(self):
+        return self.count
+
+class CallbackValue:
+    """Value read from the program when the metrics are collected (gauge or counter)."""
+    def __init__(self, function, kind="gauge"):
+        self.function = function
+        self.kind = kind
+
+    def value(self):
+        return self.function()
+
+class Histogram:
+    """Fixed-bucket histogram; quantiles are approximated by the bucket upper bounds."""
+    kind = "histogram"
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot: above the last bucket
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """Return the upper bound of the bucket holding the q-quantile, or None without samples."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return bound
+        return float("inf")
+
+# name -> {"help": text, "metrics": {labels tuple: metric}}
+registry = {}
+registry_lock = threading.Lock()
+
+def _register(name, help_text, labels, metric):
+    key = tuple(sorted((labels or {}).items()))
+    with registry_lock:
+        family = registry.setdefault(name, {"help": help_text, "metrics": {}})
+        family["metrics"][key] = metric
+    return metric
+
+def counter(name, help_text, labels=None):
+    return _register(name, help_text, labels, Counter())
+
+def callback(name, help_text, function, kind="gauge", labels=None):
+    return _register(name, help_text, labels, CallbackValue(function, kind))
+
+def histogram(name, help_text, labels=None, buckets=LATENCY_BUCKETS):
+    return _register(name, help_text, labels, Histogram(buckets))
+
+def unregister(name, labels=None):
+    key = tuple(sorted((labels or {}).items()))
+    with registry_lock:
+        family = registry.get(name)
+        if family is not None:
+            family["metrics"].pop(key, None)
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+def render_prometheus():
+    """Return every metric in the Prometheus text exposition format."""
+    lines = []
+    with registry_lock:
+        families = [(name, family["help"], list(family["metrics"].items())) for name, family in registry.items()]
+    for name, help_text, metrics in families:
+        if not metrics:
+            continue
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {metrics[0][1].kind}")
+        for key, metric in metrics:
+            if isinstance(metric, Histogram):
+                cumulative = 0
+                for bound, count in zip(metric.buckets, metric.counts):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_format_labels(key, [('le', repr(bound))])} {cumulative}")
+                lines.append(f"{name}_bucket{_format_labels(key, [('le', '+Inf')])} {metric.count}")
+                lines.append(f"{name}_sum{_format_labels(key)} {metric.sum}")
+                lines.append(f"{name}_count{_format_labels(key)} {metric.count}")
+            else:
+                try:
+                    value = metric.value()
+                except Exception:
+                    continue
+                lines.append(f"{name}{_format_labels(key)} {value}")
+    return "\n".join(lines) + "\n"
+
+def snapshot():
+    """Return {name: {labels tuple: value}}; histograms give (p50, p99, count)."""
+    result = {}
+    with registry_lock:
+        families = [(name, list(family["metrics"].items())) for name, family in registry.items()]
+    for name, metrics in families:
+        values = result[name] = {}
+        for key, metric in metrics:
+            if isinstance(metric, Histogram):
+                values[key] = (metric.quantile(0.5), metric.quantile(0.99), metric.count)
+            else:
+                try:
+                    values[key] = metric.value()
+                except Exception:
+                    pass
+    return result
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # No line per scrape on stderr
+
+def start_http_server(port, host="127.0.0.1"):
+    """Serve /metrics on a loopback address from a background thread. Returns the server."""
+    if not ipaddress.ip_address(host).is_loopback:
+        raise ValueError(f"The metrics endpoint only listens on loopback addresses, not {host}")
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -0,0 +1,158 @@
+"""
+Email notification of alerts.
+
+Detectors never talk to the mail server: record_event() only puts the event in
+a bounded queue. A worker thread groups the queued events into digests (one
+mail per digest_size events or digest_interval seconds) and sends them over one
+SMTP connection that is kept open between mails, retrying with an exponential
+backoff when the server is unreachable.
+"""
+from email.message import EmailMessage
+import queue
+import smtplib
+import socket
+import threading
+import time
+import events
+
+class MailNotifier:
+    """
+    Send the events of at least min_severity to recipients by email, in digests.
+    smtp_factory(host, port, timeout) returns the SMTP connection (smtplib.SMTP
+    by default), so a stub or a local test server can be used instead.
+    """
+    def __init__(self, sender, recipients, host="localhost", port=25, username=None, password=None,
+                 starttls=False, min_severity=events.ALERT, digest_size=20, digest_interval=60.0,
+                 queue_size=1000, max_retries=5, retry_delay=2.0, idle_timeout=120.0, smtp_factory=None):
+        self.sender = sender
+        self.recipients = list(recipients)
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.min_severity = min_severity
+        self.digest_size = digest_size
+        self.digest_interval = digest_interval
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.idle_timeout = idle_timeout  # Close the connection after this long without mail
+        self.smtp_factory = smtp_factory or smtplib.SMTP
+        self.queue = queue.Queue(queue_size)
+        self.dropped = 0  # Events lost because the queue was full
+        self.sent = 0  # Mails sent
+        self.connection = None
+        self.last_used = 0.0
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def record_event(self, event):
+        """Event pipeline handler: queue the event without ever waiting."""
+        if event.severity < self.min_severity or event.key == "mail_error":
+            return
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout=30.0):
+        """Send the queued events now. Returns False if it took longer than timeout."""
+        done = threading.Event()
+        try:
+            self.queue.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def stop(self, timeout=30.0):
+        """Send the queued events, close the connection and stop the worker thread."""
+        self.flush(timeout)
+        self.stop_event.set()
+        self.thread.join(timeout)
+
+    def _run(self):
+        digest = []
+        deadline = None
+        while not self.stop_event.is_set():
+            wait = self.digest_interval if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self.queue.get(timeout=min(wait, 1.0))
+            except queue.Empty:
+                item = None
+            if isinstance(item, threading.Event):  # flush()
+                if digest:
+                    self._send_digest(digest)
+                    digest, deadline = [], None
+                item.set()
+                continue
+            if item is not None:
+                digest.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.digest_interval
+            if digest and (len(digest) >= self.digest_size or time.monotonic() >= deadline):
+                self._send_digest(digest)
+                digest, deadline = [], None
+            elif not digest and self.connection is not None and time.monotonic() - self.last_used > self.idle_timeout:
+                self._close()
+        self._close()
+
+    def _send_digest(self, digest):
+        message = self._build_message(digest)
+        delay = self.retry_delay
+        for attempt in range(self.max_retries + 1):
+            try:
+                self._connect().send_message(message)
+                self.sent += 1
+                self.last_used = time.monotonic()
+                return True
+            except (smtplib.SMTPException, OSError) as e:
+                self._close()  # The next attempt starts with a new connection
+                error = e
+            if attempt < self.max_retries:
+                self.stop_event.wait(delay)
+                delay = min(delay * 2, 300.0)
+        events.warning(f"Could not send the alert mail ({len(digest)} alerts) after {self.max_retries + 1} attempts: {error}",
+                       key="mail_error")
+        return False
+
+    def _build_message(self, digest):
+        message = EmailMessage()
+        if len(digest) == 1:
+            message["Subject"] = f"[ScanOwl] {digest[0].message[:100]}"
+        else:
+            message["Subject"] = f"[ScanOwl] {len(digest)} alerts"
+        message["From"] = self.sender
+        message["To"] = ", ".join(self.recipients)
+        lines = [f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(event.time))} {events.format_event(event)}"
+                 for event in digest]
+        dropped, self.dropped = self.dropped, 0
+        if dropped:
+            lines.append(f"{dropped} more alerts were dropped because the mail queue was full.")
+        lines.append(f"\nSent by ScanOwl on {socket.gethostname()}.")
+        message.set_content("\n".join(lines))
+        return message
+
+    def _connect(self):
+        if self.connection is None:
+            connection = self.smtp_factory(self.host, self.port, timeout=30)
+            try:
+                connection.ehlo()
+                if self.starttls:
+                    connection.starttls()
+                    connection.ehlo()
+                if self.username:
+                    connection.login(self.username, self.password or "")
+            except Exception:
+                connection.close()
+                raise
+            self.connection = connection
+        return self.connection
+
+    def _close(self):
+        if self.connection is not None:
+            try:
+                self.connection.quit()
+            except (smtplib.SMTPException, OSError):
+                self.connection.close()
+            self.connection = None
@@ -0,0 +1,137 @@
+"""
+Lifecycle of the capture jobs (MAC acquisition, network monitoring).
+
+Each job runs in its own thread with its own cancellation token, so stopping
+one job never stops another, and a job can be restarted while the previous
+run is still closing its socket. stop() only sets the token and returns; the
+job thread runs its cleanup itself and a watchdog reports jobs that miss the
+stop deadline, so the caller (the GUI thread) never waits on a join.
+"""
+import threading
+import time
+import events
+
+# Job states
+STARTING = "starting"
+RUNNING = "running"
+STOPPING = "stopping"
+STOPPED = "stopped"
+FAILED = "failed"
+
+class CaptureJob:
+    """
+    One run of a job: target(stop_event) in a thread, then cleanup() in the same thread.
+    stats holds the counters of this run only (e.g. capture.new_capture_stats()).
+    """
+    def __init__(self, name, target, cleanup=None, stats=None):
+        self.name = name
+        self.target = target
+        self.cleanup = cleanup
+        self.stats = {} if stats is None else stats
+        self.stop_event = threading.Event()  # Cancellation token of this run only
+        self.state = STARTING
+        self.error = None  # Exception that made the run fail
+        self.thread = threading.Thread(target=self._run, name=f"skanowl-{name}", daemon=True)
+
+    def _run(self):
+        if self.state == STARTING:  # Not if stop() came first
+            self._set_state(RUNNING)
+        state = STOPPED
+        try:
+            self.target(self.stop_event)
+        except Exception as e:
+            events.warning(f"{self.name} failed: {e}", key=("job_failed", self.name))
+            self.error = e
+            state = FAILED
+        finally:
+            if self.cleanup is not None:
+                try:
+                    self.cleanup()
+                except Exception as e:
+                    events.warning(f"Error while stopping {self.name}: {e}")
+            self._set_state(state)
+
+    def _set_state(self, state):
+        self.state = state
+        events.info(f"{self.name}: {state}")
+
+    @property
+    def active(self):
+        return self.state in (STARTING, RUNNING)
+
+class SessionManager:
+    """Start, stop and restart named capture jobs; at most one active run per name."""
+    def __init__(self, stop_timeout=5.0):
+        self.stop_timeout = stop_timeout
+        self.jobs = {}  # name -> latest CaptureJob
+        self.lock = threading.Lock()
+
+    def start(self, name, target, cleanup=None, stats=None):
+        """Start target(stop_event) as job name. Returns False if the job is already active."""
+        with self.lock:
+            job = self.jobs.get(name)
+            if job is not None and job.active:
+                return False
+            job = self.jobs[name] = CaptureJob(name, target, cleanup, stats)
+        job.thread.start()
+        return True
+
+    def stop(self, name, wait=False):
+        """
+        Cancel job name. Returns at once unless wait is set, in which case it waits
+        up to stop_timeout seconds for the cleanup. Returns False if the job was not active.
+        """
+        with self.lock:
+            job = self.jobs.get(name)
+            if job is None or not job.active:
+                return False
+            job.state = STOPPING
+        job.stop_event.set()
+        events.info(f"{name}: {STOPPING}")
+        if wait:
+            self._join(job)
+        else:
+            threading.Thread(target=self._join, args=(job,), daemon=True).start()
+        return True
+
+    def restart(self, name, target, cleanup=None, stats=None):
+        """Cancel the current run of name (without waiting for it) and start a new one."""
+        self.stop(name)
+        with self.lock:
+            job = self.jobs[name] = CaptureJob(name, target, cleanup, stats)
+        job.thread.start()
+
+    def stop_all(self, wait=False):
+        """Cancel every active job; with wait, wait for all of them within one stop_timeout."""
+        with self.lock:
+            names = [name for name, job in self.jobs.items() if job.active]
+        for name in names:
+            self.stop(name)
+        if wait:
+            deadline = time.monotonic() + self.stop_timeout
+            for name in names:
+                self.jobs[name].thread.join(max(0.0, deadline - time.monotonic()))
+        return names
+
+    def state(self, name):
+        job = self.jobs.get(name)
+        return job.state if job is not None else STOPPED
+
+    def error(self, name):
+        """Return the exception that made the last run of name fail, or None."""
+        job = self.jobs.get(name)
+        return job.error if job is not None else None
+
+    def stats(self, name):
+        """Return the counters of the last run of name (empty before the first run)."""
+        job = self.jobs.get(name)
+        return job.stats if job is not None else {}
+
+    def is_active(self, name):
+        job = self.jobs.get(name)
+        return job is not None and job.active
+
+    def _join(self, job):
+        job.thread.join(self.stop_timeout)
+        if job.thread.is_alive():
+            events.warning(f"{job.name} did not stop within {self.stop_timeout:.0f} s", key=("job_stuck", job.name))
@@ -0,0 +1,179 @@
+"""
+Command-line entry point of ScanOwl, for headless sensors (PyQt5 is not imported).
+
+    python -m skanowl monitor --iface eth0 --known known.txt --unknown unknown.txt
+    python -m skanowl acquire --iface eth0 --known known.txt
+    python -m skanowl analyze capture.pcapng --known known.txt [--summary]
+    python -m skanowl scan --network 192.168.0.0/22 --known known.txt --unknown unknown.txt
+    python -m skanowl inventory devices.db --import-known known.txt --export-unknown unknown.txt
+
+monitor and acquire run until SIGTERM or Ctrl+C, or exit with status 1 if the capture
+stops by itself (e.g. the interface went away). The known MAC file is re-read when it
+changes on disk (config.watch_mac_files), or on SIGHUP.
+With --metrics-port, live counters are served at http://127.0.0.1:PORT/metrics.
+analyze replays a pcap/pcapng file through the detectors and exits.
+"""
+import argparse
+import signal
+import sys
+import threading
+import config
+import main_program
+import events
+import session
+import whriteresults
+from inventory import Inventory
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="skanowl", description="ScanOwl network monitoring without the GUI.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in [
+        ("monitor", "compare source MACs with the known list and detect ARP/MAC spoofing"),
+        ("acquire", "write every MAC address seen on the network to the known MAC file")
+    ]:
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("--iface", help="interface to capture on (default: scapy default interface)")
+        command.add_argument("--known", help="file of known MAC addresses")
+        command.add_argument("--unknown", help="file where new unknown MAC addresses are logged")
+        command.add_argument("--oui", help="IEEE registry CSV used to name the vendor of unknown devices")
+        command.add_argument("--db", help="SQLite device inventory to keep up to date")
+        command.add_argument("--backend", choices=["scapy", "raw"], default="scapy",
+                             help="capture backend: full scapy dissection or raw fixed-offset decoding")
+        command.add_argument("--processes", type=int, default=1,
+                             help="decode the frames in this many worker processes (monitor only, raw capture)")
+        command.add_argument("--bpf-exclude-known", action="store_true",
+                             help="monitor only: drop the IPv4 traffic of known devices in the kernel (Linux); "
+                                  "their traffic is then missing from the top talkers and the inventory")
+        command.add_argument("--metrics-port", type=int, default=config.metrics_port,
+                             help="serve Prometheus metrics on 127.0.0.1:PORT (0: disabled)")
+
+    command = commands.add_parser("analyze", help="run the detectors on a pcap/pcapng file")
+    command.add_argument("capture_file", help="pcap or pcapng file to analyze")
+    command.add_argument("--known", help="file of known MAC addresses")
+    command.add_argument("--unknown", help="file where new unknown MAC addresses are logged")
+    command.add_argument("--oui", help="IEEE registry CSV used to name the vendor of unknown devices")
+    command.add_argument("--db", help="SQLite device inventory to keep up to date")
+    command.add_argument("--summary", action="store_true", help="only count frames and MAC addresses, skip the detectors")
+    command.add_argument("--processes", type=int, default=1, help="decode the frames in this many worker processes")
+
+    command = commands.add_parser("scan", help="discover the devices of a subnet with an ARP sweep")
+    command.add_argument("--network", help="subnet to sweep (default: the /24 of the interface)")
+    command.add_argument("--iface", help="interface to send the requests on (default: scapy default interface)")
+    command.add_argument("--known", help="file of known MAC addresses")
+    command.add_argument("--unknown", help="file where new unknown MAC addresses are logged")
+    command.add_argument("--oui", help="IEEE registry CSV used to name the vendor of unknown devices")
+    command.add_argument("--db", help="SQLite device inventory to keep up to date")
+
+    command = commands.add_parser("inventory", help="import or export the text files of a device inventory")
+    command.add_argument("db", help="SQLite device inventory")
+    command.add_argument("--import-known", help="mark the MAC addresses of this file as known")
+    command.add_argument("--import-unknown", help="mark the MAC addresses of this file as unknown")
+    command.add_argument("--export-known", help="write the known MAC addresses to this file")
+    command.add_argument("--export-unknown", help="write the unknown MAC addresses already logged to this file")
+    return parser
+
+def load_files(args):
+    """Load the inventory, MAC and vendor files given on the command line."""
+    if args.db:
+        main_program.open_inventory(args.db)
+    if args.oui:
+        main_program.load_vendor_table(args.oui)
+    if args.known:
+        main_program.select_known_mac(args.known)
+    if args.unknown:
+        main_program.select_unknown_mac(args.unknown)
+
+def run_scan(args):
+    """Run one ARP sweep and classify the devices found."""
+    main_program.capture_iface = args.iface
+    load_files(args)
+    result = main_program.quick_scan(network=args.network)
+    whriteresults.mac_writer.stop()
+    main_program.close_inventory()
+    main_program.close_mail_notifier()
+    events.flush()
+    return 0 if result is not None else 1
+
+def run_inventory(args):
+    """Import/export the text files of an inventory."""
+    inventory = Inventory(args.db)
+    try:
+        for path, known in [(args.import_known, True), (args.import_unknown, False)]:
+            if path:
+                print(f"[+] Imported {inventory.import_text(path, known)} MAC addresses from {path}")
+        for path, known in [(args.export_known, True), (args.export_unknown, False)]:
+            if path:
+                print(f"[+] Exported {inventory.export_text(path, known)} MAC addresses to {path}")
+    finally:
+        inventory.close()
+    return 0
+
+def run_analysis(args):
+    """Replay a capture file through the detectors."""
+    load_files(args)
+    stats = main_program.analyze_capture_file(args.capture_file, summary_only=args.summary, processes=args.processes)
+    main_program.close_inventory()
+    main_program.close_mail_notifier()
+    events.flush()
+    return 0 if stats["frames"] else 1
+
+def run_daemon(args):
+    """Run acquisition or monitoring until SIGTERM/SIGINT, reloading the known MAC file on SIGHUP."""
+    main_program.capture_iface = args.iface
+    main_program.capture_backend = args.backend
+    main_program.capture_processes = args.processes
+    main_program.bpf_exclude_known = args.bpf_exclude_known
+    load_files(args)
+    server = main_program.start_metrics_server(args.metrics_port) if args.metrics_port else None
+
+    stop_requested = threading.Event()
+    reload_requested = threading.Event()
+    # The handlers only set flags, the work is done by the loop below
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_requested.set())
+    signal.signal(signal.SIGINT, lambda signum, frame: stop_requested.set())
+    if hasattr(signal, "SIGHUP"):
+        signal.signal(signal.SIGHUP, lambda signum, frame: reload_requested.set())
+
+    if args.command == "monitor":
+        job = main_program.MONITORING
+        main_program.start_network_monitoring_threads()
+    else:
+        job = main_program.ACQUISITION
+        main_program.start_mac_acquisition_thread()
+
+    status = 0
+    while not stop_requested.wait(0.5):
+        if reload_requested.is_set():
+            reload_requested.clear()
+            main_program.reload_known_mac()
+        state = main_program.session.state(job)
+        if state in (session.STOPPED, session.FAILED):
+            # The capture ended without being asked to: nothing is monitored any more
+            error = main_program.session.error(job)
+            detail = f": {error}" if error else ""
+            events.alert(f"{job} {state}{detail}, exiting.", key=("job_ended", job))
+            status = 1
+            break
+
+    # Wait for the capture jobs to write their results before the process exits
+    main_program.stop_all_threads(wait=True)
+    if server is not None:
+        server.shutdown()
+    main_program.close_inventory()
+    main_program.close_mail_notifier()
+    events.flush()
+    return status
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "inventory":
+        return run_inventory(args)
+    main_program.load_config()  # The command-line options below override these files
+    if args.command == "analyze":
+        return run_analysis(args)
+    if args.command == "scan":
+        return run_scan(args)
+    return run_daemon(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
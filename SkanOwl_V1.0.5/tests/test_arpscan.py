@@ -0,0 +1,31 @@
+import socket
+import struct
+import pytest
+
+pytest.importorskip("scapy")
+import arpscan
+
+def arp_reply(hwsrc, psrc, pdst="192.168.1.2"):
+    ethernet = b"\xff" * 6 + hwsrc + struct.pack("!H", 0x0806)
+    arp = struct.pack("!HHBBH", 1, 0x0800, 6, 4, 2) + hwsrc + socket.inet_aton(psrc) + b"\x00" * 6 + socket.inet_aton(pdst)
+    return ethernet + arp
+
+class FakeListener:
+    def __init__(self, frames):
+        self.frames = list(frames)
+
+    def select(self, sockets, timeout):
+        return sockets if self.frames else []
+
+    def recv_raw(self):
+        return None, self.frames.pop(0), None
+
+def test_only_replies_of_probed_addresses_are_kept():
+    listener = FakeListener([
+        arp_reply(b"\x00\x11\x22\x33\x44\x55", "192.168.1.10"),
+        arp_reply(b"\x00\x11\x22\x33\x44\x66", "192.168.1.20"),  # Not asked
+        arp_reply(b"\x00\x11\x22\x33\x44\x77", "10.0.0.1"),  # Other subnet
+    ])
+    found = {}
+    arpscan._collect_replies(listener, found, {"192.168.1.10", "192.168.1.11"}, 0.1)
+    assert found == {"192.168.1.10": 0x001122334455}
@@ -0,0 +1,33 @@
+from arpwatch import ArpBindingTable
+
+def test_alert_only_when_the_binding_changes():
+    table = ArpBindingTable()
+    assert table.observe("10.0.0.1", 1, now=0.0) == []
+    assert table.observe("10.0.0.1", 1, now=1.0) == []
+    alerts = table.observe("10.0.0.1", 2, gratuitous=True, now=2.0)
+    assert [(a.kind, a.old_mac, a.new_mac, a.count, a.gratuitous) for a in alerts] == [("binding_changed", 1, 2, 1, True)]
+    assert table.ips_per_mac == {2: 1}
+
+def test_mac_claiming_many_ips_is_reported_once():
+    table = ArpBindingTable(max_ips_per_mac=3)
+    alerts = []
+    for i in range(5):
+        alerts.extend(table.observe(f"10.0.0.{i}", 7, now=float(i)))
+    assert [(a.kind, a.ip, a.count) for a in alerts] == [("mac_claims_many_ips", "10.0.0.2", 3)]
+
+def test_least_recently_seen_binding_is_evicted():
+    table = ArpBindingTable(max_entries=2)
+    table.observe("10.0.0.1", 1, now=0.0)
+    table.observe("10.0.0.2", 2, now=1.0)
+    table.observe("10.0.0.1", 1, now=2.0)  # Seen again, 10.0.0.2 is now the oldest
+    table.observe("10.0.0.3", 3, now=3.0)
+    assert list(table.bindings) == ["10.0.0.1", "10.0.0.3"]
+    assert table.ips_per_mac == {1: 1, 3: 1}
+
+def test_expired_bindings_are_forgotten():
+    table = ArpBindingTable(ttl=10.0)
+    table.observe("10.0.0.1", 1, now=0.0)
+    table.observe("10.0.0.2", 2, now=5.0)
+    assert table.observe("10.0.0.1", 9, now=12.0) == []  # Expired: a new binding, not a change
+    assert len(table) == 2
+    assert table.ips_per_mac == {2: 1, 9: 1}
@@ -0,0 +1,20 @@
+import pytest
+
+pytest.importorskip("scapy")
+import benchmark
+
+def test_same_seed_gives_the_same_capture(tmp_path):
+    first, second, other = tmp_path / "a.pcap", tmp_path / "b.pcap", tmp_path / "c.pcap"
+    known = benchmark.generate_pcap(str(first), frames=2000, macs=50, seed=7)
+    assert benchmark.generate_pcap(str(second), frames=2000, macs=50, seed=7) == known
+    benchmark.generate_pcap(str(other), frames=2000, macs=50, seed=8)
+    assert first.read_bytes() == second.read_bytes()
+    assert first.read_bytes() != other.read_bytes()
+
+def test_compare_results_flags_regressions_beyond_the_threshold(capsys):
+    base = {"frames": 1000, "pps": 100000.0, "peak_rss_kb": 50000, "latency_us": {"p99": 10.0}, "alerts": {"arp": 2}}
+    new = {"frames": 1000, "pps": 90000.0, "peak_rss_kb": 51000, "latency_us": {"p99": 10.4}, "alerts": {"arp": 2}}
+    assert benchmark.compare_results(base, new, threshold=5.0) == ["pps"]
+    assert "pps: 100,000.00 -> 90,000.00 (-10.0%)  <- regression" in capsys.readouterr().out
+    assert benchmark.compare_results(base, new, threshold=15.0) == []
+    assert benchmark.compare_results(base, dict(new, alerts={"arp": 3}), threshold=15.0) == ["alerts arp"]
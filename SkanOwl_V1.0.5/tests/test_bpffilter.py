@@ -0,0 +1,29 @@
+from bpffilter import ExclusionFilter, build_exclusion_filter, prefix_clause
+from macaddr import MacPrefixIndex, MacSet
+
+def test_prefix_clauses():
+    assert prefix_clause(0xAABBCC, 24) == "ether[6:4] & 0xffffff00 = 0xaabbcc00"
+    assert prefix_clause(0xAABBCCDDE, 36) == "(ether[6:4] = 0xaabbccdd and ether[10:2] & 0xf000 = 0xe000)"
+
+def test_exclusion_keeps_arp():
+    text = build_exclusion_filter("ip or arp", [0xAABBCCDDEEFF])
+    assert text == "(ip or arp) and not (ip and (ether src aa:bb:cc:dd:ee:ff))"
+    assert build_exclusion_filter("ip or arp", []) == "ip or arp"
+
+def test_too_many_clauses_fall_back_to_the_base_filter():
+    assert build_exclusion_filter("ip", range(3), [(0xAABBCC, 24)], max_clauses=3) == "ip"
+
+def test_prefixes_count_against_the_clause_limit():
+    macs = MacSet(range(1, 11))
+    hits = {9: 100, 10: 50}
+    exclusion = ExclusionFilter("ip", macs, MacPrefixIndex([(0xAABBCC, 24)]), hits, max_clauses=3)
+    text = exclusion.build()
+    assert exclusion.truncated
+    assert text.count("ether src") == 2
+    assert "00:00:00:00:00:09" in text and "00:00:00:00:00:0a" in text
+    assert "ether[6:4]" in text
+
+def test_more_prefixes_than_clauses_exclude_nothing():
+    prefixes = MacPrefixIndex([(0xAABBCC, 24), (0xAABBCD, 24)])
+    exclusion = ExclusionFilter("ip", MacSet([1]), prefixes, {}, max_clauses=1)
+    assert exclusion.build() == "ip"
@@ -0,0 +1,116 @@
+import socket
+import struct
+import pytest
+
+pytest.importorskip("scapy")
+import capture
+
+SRC = bytes.fromhex("001122334455")
+
+def ipv4_frame(src=SRC, ip="10.0.0.1", vlan=False):
+    tag = b"\x81\x00\x00\x05" if vlan else b""
+    return b"\xff" * 6 + src + tag + b"\x08\x00" + bytes(12) + socket.inet_aton(ip) + socket.inet_aton("10.0.0.2")
+
+def arp_frame(op=2, hwsrc=SRC, psrc="10.0.0.1", pdst="10.0.0.254"):
+    arp = struct.pack("!HHBBH", 1, 0x0800, 6, 4, op) + hwsrc + socket.inet_aton(psrc) + bytes(6) + socket.inet_aton(pdst)
+    return b"\xff" * 6 + SRC + b"\x08\x06" + arp
+
+def test_decode_ipv4():
+    frame = capture.decode_frame(ipv4_frame())
+    assert (frame.src_mac, frame.ip_src, frame.arp_op, frame.length) == (0x001122334455, "10.0.0.1", None, 34)
+
+def test_decode_vlan_tagged_ipv4():
+    assert capture.decode_frame(ipv4_frame(vlan=True)).ip_src == "10.0.0.1"
+
+def test_decode_arp():
+    frame = capture.decode_frame(arp_frame(hwsrc=bytes.fromhex("00aabbccddee")))
+    assert (frame.arp_op, frame.arp_psrc, frame.arp_hwsrc, frame.arp_pdst) == (2, "10.0.0.1", 0x00AABBCCDDEE, "10.0.0.254")
+    assert frame.src_mac == 0x001122334455
+
+def test_other_and_short_frames_are_skipped():
+    assert capture.decode_frame(b"\xff" * 12 + b"\x86\xdd" + bytes(40)) is None  # IPv6
+    assert capture.decode_frame(b"\xff" * 10) is None
+    assert capture.decode_frame(b"\xff" * 12 + b"\x08\x00" + bytes(10)) is None  # Truncated IPv4 header
+
+def write_pcap(path, frames, order="<", linktype=1, truncate=0, times=None, magic=0xA1B2C3D4):
+    data = struct.pack(order + "IHHiIII", magic, 2, 4, 0, 0, 65535, linktype)
+    for frame, (seconds, fraction) in zip(frames, times or [(0, 0)] * len(frames)):
+        data += struct.pack(order + "IIII", seconds, fraction, len(frame), len(frame)) + frame
+    path.write_bytes(data[:len(data) - truncate])
+    return str(path)
+
+def pad(data):
+    return data + bytes(-len(data) % 4)
+
+def pcapng_block(order, block_type, body):
+    length = 12 + len(body)
+    return struct.pack(order + "II", block_type, length) + body + struct.pack(order + "I", length)
+
+def pcapng_section(order, linktypes, packets, tsresol=None, timestamp=0):
+    """packets: (interface, frame) for enhanced blocks, (None, frame) for simple blocks."""
+    data = pcapng_block(order, 0x0A0D0D0A, struct.pack(order + "IHHq", 0x1A2B3C4D, 1, 0, -1))
+    options = b"" if tsresol is None else struct.pack(order + "HHB3x", 9, 1, tsresol) + bytes(4)
+    for linktype in linktypes:
+        data += pcapng_block(order, 1, struct.pack(order + "HHI", linktype, 0, 65535) + options)
+    for interface, frame in packets:
+        if interface is None:
+            data += pcapng_block(order, 3, struct.pack(order + "I", len(frame)) + pad(frame))
+        else:
+            header = struct.pack(order + "IIIII", interface, timestamp >> 32, timestamp & 0xFFFFFFFF, len(frame), len(frame))
+            data += pcapng_block(order, 6, header + pad(frame))
+    return data
+
+@pytest.mark.parametrize("order", ["<", ">"])
+def test_pcap_records_in_both_byte_orders(tmp_path, order):
+    frames = [ipv4_frame(ip=f"10.0.0.{i}") for i in range(3)] + [arp_frame()]
+    assert list(capture.iter_capture_file(write_pcap(tmp_path / "a.pcap", frames, order))) == frames
+
+def test_truncated_pcap_stops_at_the_last_whole_record(tmp_path):
+    frames = [ipv4_frame(), arp_frame()]
+    assert list(capture.iter_capture_file(write_pcap(tmp_path / "a.pcap", frames, truncate=5))) == frames[:1]
+
+def test_pcap_of_another_link_type_yields_nothing(tmp_path):
+    assert list(capture.iter_capture_file(write_pcap(tmp_path / "a.pcap", [ipv4_frame()], linktype=105))) == []
+
+def test_empty_and_unknown_files(tmp_path):
+    empty = tmp_path / "empty.pcap"
+    empty.write_bytes(b"")
+    assert list(capture.iter_capture_file(str(empty))) == []
+    other = tmp_path / "notes.txt"
+    other.write_bytes(b"not a capture file at all")
+    with pytest.raises(ValueError):
+        list(capture.iter_capture_file(str(other)))
+
+@pytest.mark.parametrize("order", ["<", ">"])
+def test_pcapng_keeps_the_ethernet_interfaces_only(tmp_path, order):
+    ethernet, other = ipv4_frame(ip="10.0.0.1"), ipv4_frame(ip="10.0.0.2")
+    data = pcapng_section(order, [1, 105], [(0, ethernet), (1, other), (None, arp_frame())])
+    path = tmp_path / "a.pcapng"
+    path.write_bytes(data)
+    assert list(capture.iter_capture_file(str(path))) == [ethernet, arp_frame()]
+
+def test_pcapng_sections_reset_the_interfaces(tmp_path):
+    first, second = ipv4_frame(ip="10.0.0.1"), ipv4_frame(ip="10.0.0.2")
+    data = pcapng_section("<", [1], [(0, first)]) + pcapng_section(">", [105], [(0, second)])
+    path = tmp_path / "a.pcapng"
+    path.write_bytes(data + b"\x06\x00\x00\x00")  # Truncated trailing block
+    assert list(capture.iter_capture_file(str(path))) == [first]
+
+def test_pcap_records_carry_their_capture_time(tmp_path):
+    frames = [ipv4_frame(), arp_frame()]
+    path = write_pcap(tmp_path / "a.pcap", frames, times=[(1700000000, 250000), (1700000060, 0)])
+    assert list(capture.iter_capture_records(path)) == [(1700000000.25, frames[0]), (1700000060.0, frames[1])]
+    path = write_pcap(tmp_path / "ns.pcap", frames[:1], times=[(10, 500000000)], magic=0xA1B23C4D)
+    assert list(capture.iter_capture_records(path)) == [(10.5, frames[0])]
+
+def test_pcapng_timestamps_follow_the_interface_resolution(tmp_path):
+    frame = ipv4_frame()
+    path = tmp_path / "a.pcapng"
+    path.write_bytes(pcapng_section("<", [1], [(0, frame), (None, frame)], timestamp=1700000000 * 10**6 + 500000))
+    assert list(capture.iter_capture_records(str(path))) == [(1700000000.5, frame)] * 2  # Simple block: previous time
+    path.write_bytes(pcapng_section(">", [1], [(0, frame)], tsresol=9, timestamp=3 * 10**9))
+    assert list(capture.iter_capture_records(str(path))) == [(3.0, frame)]
+
+def test_decoded_frame_keeps_the_record_time():
+    assert capture.decode_frame(ipv4_frame(), 12.5).time == 12.5
+    assert capture.decode_frame(arp_frame()).time is None
@@ -0,0 +1,61 @@
+import events
+from events import EventPipeline, EventQueue
+
+def make_pipeline(**options):
+    pipeline = EventPipeline(**options)
+    pipeline.auto_summary = False
+    seen = []
+    pipeline.add_handler(seen.append)
+    return pipeline, seen
+
+def test_same_key_is_emitted_once_per_window():
+    pipeline, seen = make_pipeline(dedup_window=60.0)
+    assert pipeline.emit(events.WARNING, "first", key="k")
+    assert not pipeline.emit(events.WARNING, "second", key="k")
+    assert pipeline.emit(events.WARNING, "other", key="other")
+    assert [event.message for event in seen] == ["first", "other"]
+
+def test_suppressed_count_is_reported_with_the_next_event():
+    pipeline, seen = make_pipeline(dedup_window=0.0)
+    pipeline.last_emitted["k"] = 0.0
+    pipeline.suppressed["k"] = 3
+    pipeline.emit(events.INFO, "again", key="k")
+    assert seen[-1].suppressed == 3
+    assert events.format_event(seen[-1]) == "[*] again (3 similar suppressed)"
+
+def test_rate_limited_events_are_counted_in_the_summary():
+    pipeline, seen = make_pipeline(rate=0.0, burst=2)
+    for i in range(5):
+        pipeline.emit(events.WARNING, f"new device {i}", key=("unknown_mac", i))
+    assert pipeline.emit(events.ALERT, "alerts are never rate-limited")
+    pipeline.flush()
+    assert [event.message for event in seen] == ["new device 0", "new device 1", "alerts are never rate-limited",
+                                                 "3 events rate-limited in last 10s"]
+    assert seen[-1].severity == events.WARNING
+    pipeline.flush()
+    assert len(seen) == 4
+
+def test_tallies_are_summarised_per_category():
+    pipeline, seen = make_pipeline()
+    for subject in (1, 1, 2):
+        pipeline.tally("known MACs", subject)
+    pipeline.merge_tallies({"known MACs": {3: 4}})
+    pipeline.flush()
+    assert seen[-1].message == "7 frames from 3 known MACs in last 10s"
+
+def test_remove_handler_accepts_an_equal_bound_method():
+    pipeline, seen = make_pipeline()
+    queue = EventQueue()
+    pipeline.add_handler(queue.put)
+    pipeline.remove_handler(queue.put)
+    pipeline.emit(events.INFO, "hello")
+    assert not queue.items
+    assert len(seen) == 1
+
+def test_event_queue_drops_the_oldest_events():
+    queue = EventQueue(maxlen=3)
+    for i in range(5):
+        queue.put(i)
+    assert queue.take_dropped() == 2
+    assert queue.drain(limit=2) == [2, 3]
+    assert queue.drain() == [4]
@@ -0,0 +1,38 @@
+import os
+import threading
+import events
+from filewatch import FileWatcher
+
+def touch(path, text):
+    path.write_text(text)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))  # Visible on coarse clocks
+
+def test_change_is_reported_once_stable(tmp_path):
+    path = tmp_path / "known.txt"
+    path.write_text("a\n")
+    changed = threading.Event()
+    watcher = FileWatcher(str(path), lambda p: changed.set(), interval=0.02)
+    try:
+        touch(path, "a\nb\n")
+        assert changed.wait(2.0)
+    finally:
+        watcher.stop()
+
+def test_errors_of_on_change_are_reported(tmp_path):
+    path = tmp_path / "known.txt"
+    path.write_text("a\n")
+    reported = threading.Event()
+    def handler(event):
+        if event.key == ("file_watch_error", str(path)):
+            reported.set()
+    def on_change(p):
+        raise OSError("permission denied")
+    events.pipeline.add_handler(handler)
+    watcher = FileWatcher(str(path), on_change, interval=0.02)
+    try:
+        touch(path, "b\n")
+        assert reported.wait(2.0)
+    finally:
+        watcher.stop()
+        events.pipeline.remove_handler(handler)
@@ -0,0 +1,52 @@
+import sqlite3
+import events
+from inventory import Inventory
+
+def test_only_logged_unknown_devices_are_primed(tmp_path):
+    inventory = Inventory(str(tmp_path / "devices.db"), flush_interval=0.05)
+    inventory.record_sighting(1, "10.0.0.1")  # Seen only
+    inventory.set_status(2, known=False, logged=True)  # Reported in the unknown file
+    inventory.set_status(3, known=True)
+    inventory.set_status(4, known=False, logged=True)
+    inventory.set_status(4, known=True)
+    inventory.set_status(4, known=False)  # Removed from the known list later
+    assert inventory.flush()
+    assert inventory.load_index() == ({3}, {2})
+    inventory.close()
+
+def test_sightings_are_merged_per_device(tmp_path):
+    path = str(tmp_path / "devices.db")
+    inventory = Inventory(path, flush_interval=0.05)
+    for _ in range(3):
+        inventory.record_sighting(1, "10.0.0.1")
+    inventory.record_sighting(1, "10.0.0.2")
+    inventory.close()
+    connection = sqlite3.connect(path)
+    assert connection.execute("SELECT frames FROM devices WHERE mac = 1").fetchone() == (4,)
+    assert connection.execute("SELECT count(*) FROM ip_bindings").fetchone() == (2,)
+    connection.close()
+
+def test_older_inventory_gets_the_logged_column(tmp_path):
+    path = str(tmp_path / "devices.db")
+    connection = sqlite3.connect(path)
+    connection.execute("CREATE TABLE devices (mac INTEGER PRIMARY KEY, known INTEGER NOT NULL DEFAULT 0, "
+                       "vendor TEXT, first_seen REAL, last_seen REAL, frames INTEGER NOT NULL DEFAULT 0)")
+    connection.execute("INSERT INTO devices (mac, known) VALUES (5, 0)")
+    connection.commit()
+    connection.close()
+    inventory = Inventory(path, flush_interval=0.05)
+    assert inventory.load_index() == (set(), set())
+    inventory.close()
+
+def test_only_security_events_become_alerts(tmp_path):
+    path = str(tmp_path / "devices.db")
+    inventory = Inventory(path, flush_interval=0.05)
+    inventory.record_event(events.Event(0.0, events.WARNING, "rate_limited", "12 events rate-limited in last 10s", 0))
+    inventory.record_event(events.Event(0.0, events.WARNING, "known_mac_file_not_set", "Known MAC file not set.", 0))
+    inventory.record_event(events.Event(0.0, events.WARNING, ("unknown_mac", 1), "Added unknown MAC address", 0))
+    inventory.record_event(events.Event(0.0, events.ALERT, ("arp_binding_changed", "10.0.0.1", 2), "ARP Spoofing", 0))
+    inventory.close()
+    connection = sqlite3.connect(path)
+    messages = [message for (message,) in connection.execute("SELECT message FROM alerts ORDER BY id")]
+    connection.close()
+    assert messages == ["Added unknown MAC address", "ARP Spoofing"]
@@ -0,0 +1,51 @@
+import events
+from macaddr import MacPrefixIndex, MacSet, format_mac_prefix, parse_mac, parse_mac_prefix, read_mac_entries
+
+def test_parse_mac_formats():
+    assert parse_mac("aa:bb:cc:dd:ee:ff") == 0xAABBCCDDEEFF
+    assert parse_mac("AA-BB-CC-DD-EE-FF") == 0xAABBCCDDEEFF
+    assert parse_mac("aabb.ccdd.eeff") == 0xAABBCCDDEEFF
+    assert parse_mac("aa:bb:cc") is None
+    assert parse_mac("not a mac") is None
+
+def test_parse_mac_prefix():
+    assert parse_mac_prefix("aa:bb:cc") == (0xAABBCC, 24)
+    assert parse_mac_prefix("aa:bb:cc:d") == (0xAABBCCD, 28)
+    assert parse_mac_prefix("aa:bb:cc:d0:00:00/28") == (0xAABBCCD, 28)
+    assert parse_mac_prefix("aa:bb/16") == (0xAABB, 16)
+
+def test_short_words_are_not_prefixes():
+    for text in ("a", "beef", "cafe", "aabbc", "aa:bb:cc/0", "aa:bb:cc/49", "aa:bb:cc/x"):
+        assert parse_mac_prefix(text) is None
+
+def test_read_mac_entries_warns_for_skipped_lines_only(tmp_path):
+    path = tmp_path / "known.txt"
+    path.write_text("# office\naa:bb:cc:dd:ee:ff\n\naa:bb:cc\nbeef\n")
+    seen = []
+    handler = seen.append
+    events.pipeline.add_handler(handler)
+    try:
+        macs, prefixes = read_mac_entries(str(path))
+    finally:
+        events.pipeline.remove_handler(handler)
+    assert macs == {0xAABBCCDDEEFF}
+    assert prefixes == {(0xAABBCC, 24)}
+    warnings = [event.message for event in seen if event.severity == events.WARNING]
+    assert len(warnings) == 1 and "beef" in warnings[0]
+    infos = [event.message for event in seen if event.severity == events.INFO]
+    assert any("1 MAC ranges whitelisted: aa:bb:cc:00:00:00/24" in message for message in infos)
+
+def test_prefix_index_lookup():
+    index = MacPrefixIndex([(0xAABBCC, 24), (0x1122334, 28)])
+    assert 0xAABBCC000001 in index
+    assert 0x112233400000 in index
+    assert 0x112233500000 not in index
+    assert len(index) == 2
+    assert format_mac_prefix(0x1122334, 28) == "11:22:33:40:00:00/28"
+
+def test_mac_set_apply_swaps_in_one_step():
+    macs = MacSet([1, 2])
+    version = macs.version
+    macs.apply({3}, {1})
+    assert set(macs) == {2, 3}
+    assert macs.version == version + 1
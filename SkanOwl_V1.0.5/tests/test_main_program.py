@@ -0,0 +1,128 @@
+import threading
+import time
+import pytest
+
+pytest.importorskip("scapy")
+import capture
+import config
+import main_program
+import multicapture
+from macaddr import MacPrefixIndex, MacSet
+
+A, B, C = 0x00AA00000001, 0x00AA00000002, 0x00AA00000003
+
+@pytest.fixture(autouse=True)
+def fresh_lists(monkeypatch):
+    """Run each test on empty MAC lists, with no inventory or file watcher."""
+    monkeypatch.setattr(config, "watch_mac_files", False)
+    monkeypatch.setattr(main_program, "known_macs_set", MacSet())
+    monkeypatch.setattr(main_program, "known_prefixes", MacPrefixIndex())
+    monkeypatch.setattr(main_program, "known_file_macs", set())
+    monkeypatch.setattr(main_program, "unknown_macs_set", MacSet())
+    monkeypatch.setattr(main_program, "known_mac_file", "")
+    monkeypatch.setattr(main_program, "unknown_mac_file", "")
+    monkeypatch.setattr(main_program, "inventory", None)
+
+def write(path, *lines):
+    path.write_text("".join(f"{line}\n" for line in lines))
+    return str(path)
+
+def test_selecting_another_file_removes_only_the_previous_entries(tmp_path):
+    main_program.select_known_mac(write(tmp_path / "first.txt", "00:aa:00:00:00:01", "00:aa:00:00:00:02"))
+    main_program.select_known_mac(write(tmp_path / "second.txt", "00:aa:00:00:00:02", "00:aa:00:00:00:03"))
+    known = main_program.known_macs_set
+    assert (A in known, B in known, C in known) == (False, True, True)
+    assert main_program.known_file_macs == {B, C}
+
+def test_acquired_macs_survive_a_reload(tmp_path):
+    path = write(tmp_path / "known.txt", "00:aa:00:00:00:01")
+    main_program.select_known_mac(path)
+    main_program.known_macs_set.add(C)  # Learnt by the acquisition, not in the file yet
+    write(tmp_path / "known.txt", "00:aa:00:00:00:02")
+    main_program.reload_known_mac()
+    known = main_program.known_macs_set
+    assert (A in known, B in known, C in known) == (False, True, True)
+
+def test_prefixes_are_replaced_on_reload(tmp_path):
+    path = write(tmp_path / "known.txt", "00:bb:cc")
+    main_program.select_known_mac(path)
+    assert 0x00BBCC123456 in main_program.known_prefixes
+    write(tmp_path / "known.txt", "00:dd:ee")
+    main_program.reload_known_mac()
+    assert 0x00BBCC123456 not in main_program.known_prefixes
+    assert 0x00DDEE123456 in main_program.known_prefixes
+    assert len(main_program.known_prefixes) == 1
+
+def test_unknown_file_primes_the_logged_set(tmp_path):
+    main_program.select_unknown_mac(write(tmp_path / "unknown.txt", "00:aa:00:00:00:01"))
+    assert A in main_program.unknown_macs_set
+    assert not main_program.log_unknown_mac(A, "10.0.0.1")  # Already in the file, not logged again
+    main_program.select_unknown_mac(write(tmp_path / "other.txt", "00:aa:00:00:00:02"))
+    assert A not in main_program.unknown_macs_set
+    assert B in main_program.unknown_macs_set
+
+@pytest.fixture
+def chain(monkeypatch):
+    """Swap in an empty detector chain, and unregister the test detectors afterwards."""
+    monkeypatch.setattr(main_program, "detectors", ())
+    monkeypatch.setattr(main_program, "detector_stats", {})
+    monkeypatch.setattr(main_program, "detector_latency", {})
+    yield
+    for name, _ in main_program.detectors:
+        main_program.unregister_detector(name)
+
+FRAME = capture.Frame(A, "10.0.0.1", None, None, None, None, 60)
+
+def test_registering_a_name_again_replaces_the_detector(chain):
+    calls = []
+    main_program.register_detector(lambda frame: calls.append("old"), name="probe")
+    main_program.register_detector(lambda frame: calls.append("new"), name="probe")
+    main_program.dispatch_packet(FRAME)
+    assert calls == ["new"]
+    assert [name for name, _ in main_program.detectors] == ["probe"]
+
+def test_each_detector_accounts_its_frames_and_time(chain):
+    main_program.register_detector(lambda frame: time.sleep(0.01), name="slow")
+    main_program.register_detector(lambda frame: None, name="fast")
+    for _ in range(3):
+        main_program.dispatch_packet(FRAME)
+    slow, fast = main_program.detector_stats["slow"], main_program.detector_stats["fast"]
+    assert (slow[0], fast[0]) == (3, 3)
+    assert slow[1] >= 0.03 > fast[1]
+
+def test_a_failing_detector_does_not_stop_the_next_ones(chain):
+    seen = []
+    def broken(frame):
+        raise ValueError("bad frame")
+    main_program.register_detector(broken)
+    main_program.register_detector(seen.append, name="after")
+    main_program.dispatch_packet(FRAME)
+    assert seen == [FRAME]
+    assert main_program.detector_stats["broken"][0] == 1
+
+def test_unregistering_removes_the_detector_and_its_stats(chain):
+    main_program.register_detector(lambda frame: None, name="probe")
+    main_program.dispatch_packet(FRAME)
+    main_program.unregister_detector("probe")
+    assert main_program.detectors == ()
+    assert "probe" not in main_program.detector_stats
+    main_program.dispatch_packet(FRAME)
+    assert "probe" not in main_program.detector_stats
+
+def test_stop_all_threads_flushes_off_the_calling_thread(monkeypatch):
+    flushed = threading.Event()
+    threads = []
+    def flush_results():
+        threads.append(threading.current_thread())
+        flushed.set()
+    monkeypatch.setattr(main_program, "flush_results", flush_results)
+    main_program.stop_all_threads()  # No job running, so no cleanup flushes the results
+    assert flushed.wait(5.0)
+    assert threads != [threading.current_thread()]
+    main_program.stop_all_threads(wait=True)
+    assert threads[-1] is threading.current_thread()
+
+def test_worker_statistics_cover_the_last_run_only(chain):
+    main_program.merge_detector_stats({multicapture.DECODING_STATS: (100, 0.5)})
+    main_program.merge_detector_stats({multicapture.DECODING_STATS: (40, 0.25)})
+    assert main_program.detector_stats[multicapture.DECODING_STATS] == [40, 0.25]
@@ -0,0 +1,28 @@
+import urllib.request
+import pytest
+import metrics
+
+def test_histogram_quantiles_use_bucket_bounds():
+    histogram = metrics.Histogram()
+    assert histogram.quantile(0.5) is None
+    for value in (3e-6, 3e-6, 3e-6, 0.3):
+        histogram.observe(value)
+    assert histogram.quantile(0.5) == 5e-6
+    assert histogram.quantile(0.99) == 0.5
+
+def test_endpoint_serves_the_registry():
+    counter = metrics.counter("skanowl_test_events_total", "Test counter", {"kind": "a"})
+    counter.inc(3)
+    server = metrics.start_http_server(0)
+    try:
+        port = server.server_address[1]
+        body = urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5).read().decode()
+    finally:
+        server.shutdown()
+        metrics.unregister("skanowl_test_events_total", {"kind": "a"})
+    assert "# TYPE skanowl_test_events_total counter" in body
+    assert 'skanowl_test_events_total{kind="a"} 3' in body
+
+def test_endpoint_only_listens_on_loopback():
+    with pytest.raises(ValueError):
+        metrics.start_http_server(0, host="0.0.0.0")
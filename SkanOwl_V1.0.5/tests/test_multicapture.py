@@ -0,0 +1,47 @@
+import socket
+import struct
+import time
+import pytest
+
+pytest.importorskip("scapy")
+import multicapture
+
+def ipv4_frame(mac, ip):
+    return b"\xff" * 6 + mac + b"\x08\x00" + bytes(12) + socket.inet_aton(ip) + bytes(4)
+
+def arp_frame(mac, ip):
+    arp = struct.pack("!HHBBH", 1, 0x0800, 6, 4, 2) + mac + socket.inet_aton(ip) + bytes(6) + socket.inet_aton("10.0.0.254")
+    return b"\xff" * 6 + mac + b"\x08\x06" + arp
+
+def test_workers_sum_frames_per_source_and_arp_stays_here():
+    reports = []
+    arp_frames = []
+    fanout = multicapture.CaptureFanout(2, reports.append, arp_frames.append, block=True, report_interval=0.05)
+    fanout.start()
+    for i in range(100):
+        fanout.submit(ipv4_frame(bytes([0, 1, 2, 3, 4, i % 4]), f"10.0.0.{i % 4}"))
+    fanout.submit(arp_frame(bytes([0, 9, 9, 9, 9, 9]), "10.0.0.9"))
+    stats = fanout.stop(timeout=30.0)
+    totals = {}
+    for sources in reports:
+        for key, (first, last, frames, sent) in sources.items():
+            assert first <= last
+            totals[key] = totals.get(key, 0) + frames
+    assert totals == {(0x000102030400 + i, f"10.0.0.{i}"): 25 for i in range(4)}
+    assert [(frame.arp_op, frame.arp_psrc) for frame in arp_frames] == [(2, "10.0.0.9")]
+    assert stats[multicapture.DECODING_STATS][0] == 100
+
+def test_stop_does_not_wait_for_a_dead_worker():
+    fanout = multicapture.CaptureFanout(2, lambda sources: None)
+    fanout.start()
+    fanout.processes[0].terminate()
+    fanout.processes[0].join()
+    frame = ipv4_frame(bytes(6), "10.0.0.1")  # Owned by worker 0
+    for _ in range(multicapture.BATCH_SIZE * (multicapture.QUEUE_BATCHES + 2)):
+        fanout.submit(frame)
+    start = time.monotonic()
+    fanout.stop(timeout=5.0)
+    assert time.monotonic() - start < 5.0
+    assert fanout.dropped
+    assert not fanout.collector.is_alive()
+    assert not any(process.is_alive() for process in fanout.processes)
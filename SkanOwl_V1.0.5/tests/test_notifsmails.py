@@ -0,0 +1,72 @@
+import smtplib
+import time
+import events
+from notifsmails import MailNotifier
+
+class FakeSMTP:
+    """SMTP connection whose first `failures` sends fail; the state is shared by all connections."""
+    failures = 0
+    messages = []
+    connections = 0
+
+    def __init__(self, host, port, timeout=None):
+        FakeSMTP.connections += 1
+
+    def ehlo(self):
+        pass
+
+    def send_message(self, message):
+        if FakeSMTP.failures:
+            FakeSMTP.failures -= 1
+            raise smtplib.SMTPServerDisconnected("connection lost")
+        FakeSMTP.messages.append(message)
+
+    def quit(self):
+        pass
+
+    def close(self):
+        pass
+
+def make_notifier(failures, **options):
+    FakeSMTP.failures = failures
+    FakeSMTP.messages = []
+    FakeSMTP.connections = 0
+    return MailNotifier("owl@example.org", ["admin@example.org"], smtp_factory=FakeSMTP, retry_delay=0.01, **options)
+
+def alert(message):
+    return events.Event(time.time(), events.ALERT, None, message, 0)
+
+def test_alerts_are_sent_in_one_digest():
+    notifier = make_notifier(0)
+    notifier.record_event(alert("first"))
+    notifier.record_event(alert("second"))
+    notifier.record_event(events.Event(time.time(), events.INFO, None, "not mailed", 0))
+    assert notifier.flush(5.0)
+    notifier.stop(5.0)
+    assert len(FakeSMTP.messages) == 1
+    body = FakeSMTP.messages[0].get_content()
+    assert "first" in body and "second" in body and "not mailed" not in body
+    assert FakeSMTP.messages[0]["Subject"] == "[ScanOwl] 2 alerts"
+
+def test_send_is_retried_on_a_new_connection():
+    notifier = make_notifier(2, max_retries=3)
+    notifier.record_event(alert("ARP spoofing"))
+    assert notifier.flush(5.0)
+    notifier.stop(5.0)
+    assert len(FakeSMTP.messages) == 1
+    assert FakeSMTP.connections == 3
+    assert notifier.sent == 1
+
+def test_failure_after_the_last_retry_is_reported():
+    seen = []
+    handler = seen.append
+    events.pipeline.add_handler(handler)
+    try:
+        notifier = make_notifier(10, max_retries=1)
+        notifier.record_event(alert("ARP spoofing"))
+        assert notifier.flush(5.0)
+        notifier.stop(5.0)
+    finally:
+        events.pipeline.remove_handler(handler)
+    assert FakeSMTP.messages == []
+    assert any(event.key == "mail_error" for event in seen)
@@ -0,0 +1,38 @@
+import threading
+import session
+from session import SessionManager
+
+def test_failed_job_keeps_its_error():
+    manager = SessionManager(stop_timeout=1.0)
+    def target(stop_event):
+        raise OSError("interface down")
+    assert manager.start("job", target)
+    manager.jobs["job"].thread.join(1.0)
+    assert manager.state("job") == session.FAILED
+    assert str(manager.error("job")) == "interface down"
+    assert not manager.is_active("job")
+
+def test_stop_runs_the_cleanup_in_the_job_thread():
+    manager = SessionManager(stop_timeout=1.0)
+    cleaned = threading.Event()
+    assert manager.start("job", lambda stop_event: stop_event.wait(5.0), cleanup=cleaned.set)
+    assert not manager.start("job", lambda stop_event: None)  # Already active
+    assert manager.stop("job", wait=True)
+    assert cleaned.is_set()
+    assert manager.state("job") == session.STOPPED
+    assert manager.error("job") is None
+
+def test_restart_gives_the_new_run_its_own_stats():
+    manager = SessionManager(stop_timeout=1.0)
+    first, second = {"frames": 0}, {"frames": 0}
+    def target(stats):
+        def run(stop_event):
+            stats["frames"] += 1
+            stop_event.wait(5.0)
+        return run
+    assert manager.stats("job") == {}
+    manager.start("job", target(first), stats=first)
+    manager.restart("job", target(second), stats=second)
+    manager.stop_all(wait=True)
+    assert manager.stats("job") is second
+    assert first == second == {"frames": 1}
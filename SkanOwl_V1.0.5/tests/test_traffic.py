@@ -0,0 +1,59 @@
+import random
+from traffic import CountMinSketch, TopKeys, TrafficAccounting
+
+def test_sketch_never_underestimates():
+    sketch = CountMinSketch(width=64, depth=4)
+    counts = {}
+    rng = random.Random(1)
+    for _ in range(5000):
+        key = rng.randrange(500)
+        amount = rng.randrange(1, 100)
+        sketch.add(key, amount)
+        counts[key] = counts.get(key, 0) + amount
+    assert all(sketch.estimate(key) >= count for key, count in counts.items())
+
+def test_sketch_merge_adds_counts():
+    first, second = CountMinSketch(64, 2), CountMinSketch(64, 2)
+    first.add("a", 3)
+    second.add("a", 4)
+    first.merge(second)
+    assert first.estimate("a") >= 7
+
+def test_top_keys_floor_follows_updated_candidate():
+    top = TopKeys(capacity=2)
+    top.offer("a", 1)
+    top.offer("b", 5)
+    top.offer("a", 10)
+    top.offer("c", 3)
+    assert dict(top.top(2)) == {"a": 10, "b": 5}
+    top.offer("c", 6)
+    assert dict(top.top(2)) == {"a": 10, "c": 6}
+
+def test_top_talkers_ranked_by_bytes():
+    traffic = TrafficAccounting(windows=(60, 300))
+    start = traffic.building[60].start
+    for _ in range(10):
+        traffic.add(1, "10.0.0.1", 1000, now=start)
+    traffic.add(2, "10.0.0.2", 100, now=start)
+    assert traffic.top_talkers(2, by="mac") == [(1, 10000, 10), (2, 100, 1)]
+    assert traffic.usage("10.0.0.2") == (100, 1)
+
+def test_minutes_roll_up_into_longer_windows():
+    traffic = TrafficAccounting(windows=(60, 300))
+    start = traffic.building[60].start
+    for minute in range(6):
+        traffic.add(1, None, 100, now=start + 60 * minute)
+    # The last complete minute holds one frame, the first five minutes hold five
+    assert traffic.usage(1, period=60) == (100, 1)
+    assert traffic.usage(1, period=300) == (500, 5)
+    traffic.add(2, None, 50, now=start + 60 * 6)
+    assert traffic.top_talkers(5, period=60) == [(1, 100, 1)]
+
+def test_reset_follows_the_replayed_clock():
+    traffic = TrafficAccounting(windows=(60, 300))
+    traffic.add(1, None, 100)
+    traffic.reset(float("-inf"))
+    for minute in range(3):
+        traffic.add(2, None, 10, now=1000.0 + 60 * minute)
+    assert traffic.usage(1, period=60) == (0, 0)
+    assert traffic.top_talkers(5, period=60) == [(2, 10, 1)]
@@ -0,0 +1,24 @@
+import threading
+from whriteresults import MacFileWriter
+
+def test_lines_are_written_in_order(tmp_path):
+    path = tmp_path / "macs.txt"
+    writer = MacFileWriter(batch_size=3, flush_interval=0.05)
+    for i in range(10):
+        writer.write(str(path), f"{i}\n")
+    assert writer.flush()
+    writer.stop()
+    assert path.read_text().split() == [str(i) for i in range(10)]
+
+def test_write_during_stop_keeps_one_writer_thread(tmp_path):
+    path = tmp_path / "macs.txt"
+    writer = MacFileWriter(flush_interval=0.01)
+    for _ in range(50):
+        writer.write(str(path), "a\n")
+        stopper = threading.Thread(target=writer.stop)
+        stopper.start()
+        writer.write(str(path), "b\n")
+        stopper.join()
+    writer.stop()
+    assert writer.thread is None
+    assert len(path.read_text().split()) == 100
@@ -0,0 +1,221 @@
+"""
+Per-device traffic accounting in constant memory.
+
+Bytes and frames per source MAC and per source IP are counted in Count-Min
+sketches (fixed-size tables, estimates never below the real count), and the
+top talkers are kept in a fixed number of candidates ranked by those
+estimates. Frames are summed per key in a bounded dict before they reach the
+sketches, so a busy device costs one dict update per frame.
+
+Counters are kept for the current minute; every minute they are rolled up
+into the longer windows (5 minutes, 1 hour), so the per-frame cost does not
+depend on the number of windows.
+"""
+from array import array
+import threading
+import time
+
+MASK64 = (1 << 64) - 1
+
+class CountMinSketch:
+    """Approximate counters for any number of keys in depth x width cells."""
+    # Odd 64-bit multipliers, one per row
+    MULTIPLIERS = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93,
+                   0xFF51AFD7ED558CCD, 0xC4CEB9FE1A85EC53, 0x94D049BB133111EB, 0xBF58476D1CE4E5B9)
+
+    def __init__(self, width=2048, depth=4):
+        if width & (width - 1) or not 1 <= depth <= len(self.MULTIPLIERS):
+            raise ValueError("width must be a power of two and depth at most 8")
+        self.width = width
+        self.depth = depth
+        self.shift = 64 - width.bit_length() + 1  # Top bits of the product index the row
+        self.rows = [array("q", bytes(8 * width)) for _ in range(depth)]
+
+    def indexes(self, key):
+        """Return the cell of key in each row (shared by sketches of the same size)."""
+        h = hash(key) & MASK64
+        shift = self.shift
+        return [((h * m) & MASK64) >> shift for m in self.MULTIPLIERS[:self.depth]]
+
+    def add(self, key, amount=1, indexes=None):
+        """Add amount to the counters of key and return its new estimate."""
+        estimate = None
+        for row, index in zip(self.rows, indexes or self.indexes(key)):
+            value = row[index] = row[index] + amount
+            if estimate is None or value < estimate:
+                estimate = value
+        return estimate
+
+    def estimate(self, key, indexes=None):
+        return min(row[index] for row, index in zip(self.rows, indexes or self.indexes(key)))
+
+    def merge(self, other):
+        """Add the counts of a sketch of the same size."""
+        for row, other_row in zip(self.rows, other.rows):
+            for i, value in enumerate(other_row):
+                if value:
+                    row[i] += value
+
+class TopKeys:
+    """
+    The capacity keys with the largest estimates seen so far, fed with the
+    estimates of a sketch. A key only displaces the smallest candidate when its
+    estimate is larger, so the list is only scanned when a new heavy key appears
+    (the Space-Saving replacement rule, with the sketch bounding the counts).
+    """
+    def __init__(self, capacity=64):
+        self.capacity = capacity
+        self.counts = {}  # key -> estimate
+        self.floor = 0  # Smallest estimate of the candidates once the list is full
+
+    def offer(self, key, estimate):
+        counts = self.counts
+        if key in counts:
+            previous = counts[key]
+            counts[key] = estimate
+            if previous <= self.floor and len(counts) == self.capacity:
+                self.floor = min(counts.values())  # The smallest candidate may have grown
+        elif len(counts) < self.capacity:
+            counts[key] = estimate
+            if len(counts) == self.capacity:
+                self.floor = min(counts.values())
+        elif estimate > self.floor:
+            del counts[min(counts, key=counts.get)]
+            counts[key] = estimate
+            self.floor = min(counts.values())
+
+    def top(self, n):
+        """Return the n largest candidates as (key, estimate), largest first."""
+        return sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:n]
+
+class TrafficWindow:
+    """
+    Bytes and frames of one time window, per MAC (int keys) and per IP (str keys).
+    Frames are first summed per key in a small dict of at most pending_keys
+    entries, which is folded into the sketches when full or before a query.
+    """
+    def __init__(self, start, width, depth, capacity, pending_keys=4096):
+        self.start = start
+        self.end = start
+        self.frames = 0
+        self.bytes = 0
+        self.byte_counts = CountMinSketch(width, depth)
+        self.frame_counts = CountMinSketch(width, depth)
+        self.top_macs = TopKeys(capacity)
+        self.top_ips = TopKeys(capacity)
+        self.pending = {}  # key -> [bytes, frames] not yet in the sketches
+        self.pending_keys = pending_keys
+
+    def add(self, mac, ip, length, frames=1):
+        self.frames += frames
+        self.bytes += length
+        pending = self.pending
+        for key in (mac, ip) if ip else (mac,):
+            entry = pending.get(key)
+            if entry is None:
+                pending[key] = [length, frames]
+            else:
+                entry[0] += length
+                entry[1] += frames
+        if len(pending) >= self.pending_keys:
+            self.fold()
+
+    def fold(self):
+        """Move the pending counts into the sketches and the top talkers."""
+        pending, self.pending = self.pending, {}
+        for key, (sent, frames) in pending.items():
+            indexes = self.byte_counts.indexes(key)
+            estimate = self.byte_counts.add(key, sent, indexes)
+            self.frame_counts.add(key, frames, indexes)
+            (self.top_ips if type(key) is str else self.top_macs).offer(key, estimate)
+
+    def merge(self, other):
+        self.fold()
+        other.fold()
+        self.start = min(self.start, other.start)
+        self.end = max(self.end, other.end)
+        self.frames += other.frames
+        self.bytes += other.bytes
+        self.byte_counts.merge(other.byte_counts)
+        self.frame_counts.merge(other.frame_counts)
+        # Candidates of both windows, ranked by their estimate in the merged sketch
+        for top, other_top in ((self.top_macs, other.top_macs), (self.top_ips, other.top_ips)):
+            for key in list(top.counts) + list(other_top.counts):
+                top.offer(key, self.byte_counts.estimate(key))
+
+class TrafficAccounting:
+    """
+    Rolling traffic counters. add() updates the current minute; when a minute
+    ends it is rolled up into each longer window. For every window length the
+    last complete window is kept for queries (or the one in progress until the
+    first one completes).
+    """
+    def __init__(self, windows=(60, 300, 3600), width=2048, depth=4, capacity=64):
+        self.windows = tuple(sorted(windows))
+        self.width = width
+        self.depth = depth
+        self.capacity = capacity
+        self.lock = threading.Lock()
+        now = time.time()
+        self.building = {period: self._new_window(now) for period in self.windows}
+        self.completed = {}  # period -> last complete TrafficWindow
+
+    def reset(self, start=None):
+        """Drop every counter and open new windows at start (default now)."""
+        start = time.time() if start is None else start
+        with self.lock:
+            self.building = {period: self._new_window(start) for period in self.windows}
+            self.completed = {}
+
+    def _new_window(self, start):
+        return TrafficWindow(start, self.width, self.depth, self.capacity)
+
+    def add(self, mac, ip, length, now=None, frames=1):
+        """
+        Account a frame of length bytes sent by mac (and ip), or with frames, that many
+        frames of length bytes in all. Cheap enough for every frame.
+        """
+        now = time.time() if now is None else now
+        base = self.windows[0]
+        with self.lock:
+            current = self.building[base]
+            if now - current.start >= base:
+                self._rotate(now)
+                current = self.building[base]
+            current.add(mac, ip, length, frames)
+            current.end = now
+
+    def _rotate(self, now):
+        base = self.windows[0]
+        finished = self.building[base]
+        self.completed[base] = finished
+        self.building[base] = self._new_window(now)
+        for period in self.windows[1:]:
+            window = self.building[period]
+            window.merge(finished)
+            if now - window.start >= period:
+                self.completed[period] = window
+                self.building[period] = self._new_window(now)
+
+    def window(self, period):
+        """Return the last complete window of this length, or the one in progress."""
+        with self.lock:
+            window = self.completed.get(period) or self.building[period]
+            if not window.frames:
+                window = self.building[self.windows[0]]  # Nothing rolled up yet: the current minute
+            return window
+
+    def top_talkers(self, n=10, period=60, by="mac"):
+        """Return [(MAC int or IP, bytes, frames)] of the n busiest sources of the window."""
+        window = self.window(period)
+        with self.lock:
+            window.fold()
+            top = window.top_macs if by == "mac" else window.top_ips
+            return [(key, sent, window.frame_counts.estimate(key)) for key, sent in top.top(n)]
+
+    def usage(self, key, period=60):
+        """Return the estimated (bytes, frames) sent by a MAC (int) or an IP in the window."""
+        window = self.window(period)
+        with self.lock:
+            window.fold()
+            return window.byte_counts.estimate(key), window.frame_counts.estimate(key)
@@ -0,0 +1,100 @@
+import queue
+import threading
+import time
+import events
+
+class MacFileWriter:
+    """
+    Write-behind writer for the MAC address files.
+    The capture thread only queues lines; a background thread appends them to
+    the files in batches, once batch_size lines are waiting or flush_interval
+    seconds after the first pending line.
+    """
+    def __init__(self, batch_size=256, flush_interval=1.0):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.SimpleQueue()  # Unbounded, so put() never blocks the capture thread
+        self.thread = None
+        self.thread_lock = threading.Lock()
+        self.stopping = False  # stop() in progress: the current thread must not be replaced
+
+    def write(self, path, line):
+        """Queue a line to be appended to path."""
+        self._ensure_thread()
+        self.queue.put((path, line))
+
+    def pending(self):
+        """Return the number of items waiting in the queue."""
+        return self.queue.qsize()
+
+    def flush(self, timeout=2.0):
+        """Write everything queued so far. Returns False if it took longer than timeout."""
+        if self.thread is None:
+            return True
+        done = threading.Event()
+        self.queue.put(done)
+        return done.wait(timeout)
+
+    def stop(self, timeout=2.0):
+        """Flush the pending lines and stop the writer thread."""
+        with self.thread_lock:
+            thread = self.thread
+            if thread is None or self.stopping:
+                return
+            # The sentinel is queued under the lock and no other thread can start
+            # until this one has exited, so it is the one that reads the sentinel
+            self.stopping = True
+            self.queue.put(None)
+        thread.join(timeout)
+        with self.thread_lock:
+            self.thread = None
+            self.stopping = False
+        if not self.queue.empty():
+            self._ensure_thread()  # Lines written while the thread was stopping
+
+    def _ensure_thread(self):
+        if self.thread is None:
+            with self.thread_lock:
+                if self.thread is None:
+                    self.thread = threading.Thread(target=self._run, daemon=True)
+                    self.thread.start()
+
+    def _run(self):
+        batch = {}  # path -> lines waiting to be written
+        count = 0
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = False  # Time threshold reached
+
+            if isinstance(item, tuple):
+                path, line = item
+                batch.setdefault(path, []).append(line)
+                count += 1
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+                if count < self.batch_size:
+                    continue
+
+            self._write_batch(batch)
+            batch = {}
+            count = 0
+            deadline = None
+            if item is None:
+                return
+            if isinstance(item, threading.Event):
+                item.set()
+
+    def _write_batch(self, batch):
+        for path, lines in batch.items():
+            try:
+                with open(path, "a") as file:
+                    file.write("".join(lines))
+            except Exception as e:
+                events.warning(f"Error writing to {path}: {e}", key=("write_error", path))
+
+# Writer shared by the acquisition and monitoring threads
+mac_writer = MacFileWriter()